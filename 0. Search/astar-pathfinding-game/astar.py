@@ -1,68 +1,182 @@
-import pygame
-from queue import PriorityQueue
-from gridsquare import GridSquare
+import heapq
+import math
+import time
+from typing import TYPE_CHECKING
 
+from grid import Grid, Movement, FOUR_CONNECTED, EIGHT_CONNECTED, OCTILE, OPEN, CLOSED, PATH
 
-def astar_search(draw, grid: list[list[GridSquare]], start: GridSquare, goal: GridSquare):
+if TYPE_CHECKING:
+    from gridsquare import GridSquare
+
+
+class SearchResult():
+    """
+    Outcome of a headless search: the path of (row, column)
+    positions from start to goal inclusive, its cost, and stats.
+    """
+    def __init__(self, path, cost, expanded, seconds):
+        self.path = path
+        self.cost = cost
+        self.expanded = expanded
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"SearchResult(cost={self.cost}, expanded={self.expanded}, seconds={self.seconds:.6f})"
+
+
+def find_path(grid: Grid, start: tuple, goal: tuple, on_step=None,
+              movement: Movement = OCTILE, heuristic=None):
+    """
+    Headless A* search over a grid, with no dependency on pygame.
+    Scores and parents are kept in the grid's flat arrays, stamped
+    with the search's generation so that starting a search costs
+    O(1) rather than O(cells), and neighbours are found by index
+    arithmetic. Cell states are left alone; clear_marks first if
+    a previous search marked them.
+
+    Args:
+      grid: the Grid to search, whose walls mark barriers
+      start: the (row, column) position to search from
+      goal: the (row, column) position to search to
+      on_step: optional callback on_step(event, index), called with
+        "open" when a cell joins the frontier and "closed" when it is
+        expanded. Returning False from it aborts the search.
+      movement: the Movement model, OCTILE by default
+      heuristic: h(a, b) estimating the cost between two positions,
+        by default the admissible heuristic for the movement model
+    Returns:
+      a SearchResult, or None if there is no path or the search was aborted
+    """
+    timer = time.perf_counter()
+    generation = grid.new_search()
+    columns = grid.columns
+    g_score = grid.g_score
+    f_score = grid.f_score
+    parent = grid.parent
+    stamp = grid.stamp
+    start_index = grid.index(*start)
+    goal_index = grid.index(*goal)
+    if heuristic is None:
+        heuristic = HEURISTICS[movement]
+
+    count = 0
+    expanded = 0
+    stamp[start_index] = generation
+    g_score[start_index] = 0
+    f_score[start_index] = heuristic(start, goal)
+    parent[start_index] = -1
+
+    # Open set as a binary heap of [f_score, count, index] entries, with an
+    # index of each cell's live entry. Decreasing a key marks the old entry
+    # removed (index None) and pushes a new one, and pops skip removed entries.
+    frontier = []
+    entries = {}
+    entry = [f_score[start_index], count, start_index]
+    entries[start_index] = entry
+    heapq.heappush(frontier, entry)
+
+    while frontier:
+        current = heapq.heappop(frontier)[2]
+        if current is None:
+            continue
+        del entries[current]
+        expanded += 1
+
+        if current == goal_index:
+            path = []
+            while current != -1:
+                path.append(divmod(current, columns))
+                current = parent[current]
+            path.reverse()
+            return SearchResult(path, g_score[goal_index], expanded, time.perf_counter() - timer)
+
+        for neighbour, cost in grid.neighbours(current, movement):
+            temp_g_score = g_score[current] + cost
+            if stamp[neighbour] != generation or temp_g_score < g_score[neighbour]:
+                stamp[neighbour] = generation
+                parent[neighbour] = current
+                g_score[neighbour] = temp_g_score
+                f_score[neighbour] = temp_g_score + heuristic(divmod(neighbour, columns), goal)
+
+                old_entry = entries.get(neighbour)
+                if old_entry is not None:
+                    old_entry[2] = None
+                count += 1
+                entry = [f_score[neighbour], count, neighbour]
+                entries[neighbour] = entry
+                heapq.heappush(frontier, entry)
+                if old_entry is None and on_step is not None and on_step("open", neighbour) is False:
+                    return None
+
+        if on_step is not None and current != start_index and on_step("closed", current) is False:
+            return None
+
+    return None
+
+
+def astar_search(draw, grid: Grid, start: "GridSquare", goal: "GridSquare",
+                 movement: Movement = OCTILE, search=None):
     """
     A* search algorithm.
 
     An A* search is like a breadth-first seach, except
     that in each iteration, instead of expanding the cell
-    with the shortest path from the origin, we expand the 
-    cell with the lowest overall estimated path length -- 
+    with the shortest path from the origin, we expand the
+    cell with the lowest overall estimated path length --
     this is the distance so far (g_score), plus a heuristic
-    estimate of the remaining distance (h). This can be expressed 
+    estimate of the remaining distance (h). This can be expressed
     as f(n) = g(n) + h(n)
 
+    Runs the headless find_path over the grid, marking cells
+    as they are opened and closed. draw is called after every
+    step and may return False to abort the search; wrap it in a
+    FrameThrottle to redraw at a fixed frame rate instead. search
+    replaces find_path, for example with jps.jump_point_search.
+
     See for summary of variables https://youtu.be/JtiK0DOeI4A?t=5075
     """
-    count = 0
-    g_score = {square: float("inf") for row in grid for square in row}
-    g_score[start] = 0
-    f_score = {square: float("inf") for row in grid for square in row}
-    f_score[start] = h(start.get_position(), goal.get_position())
-
-    frontier = PriorityQueue()
-    frontier.put((0, count, start))
-
-    while not frontier.empty():
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
-        current_node = frontier.get()[2]
-        
-        if current_node == goal:
-            reconstruct_path(current_node, draw)
-            goal.make_end()
-            return True
-        
-        for neighbour in current_node.neighbours:
-            temp_g_score = g_score[current_node] + 1
-
-            if temp_g_score < g_score[neighbour]:
-                neighbour.came_from_square = current_node
-                g_score[neighbour] = temp_g_score
-                f_score[neighbour] = temp_g_score + h(neighbour.get_position(), goal.get_position())
+    def on_step(event, index):
+        if index != goal.index:
+            grid.set_state(index, OPEN if event == "open" else CLOSED)
+        return draw()
 
-                if neighbour not in frontier.queue:
-                    count += 1
-                    frontier.put((f_score[neighbour], count, neighbour))
-                    neighbour.make_open()
+    grid.clear_marks()
+    if search is None:
+        search = find_path
+    result = search(grid, start.get_position(), goal.get_position(), on_step, movement)
+    if result is None:
+        return False
+
+    reconstruct_path(grid, result.path, draw)
+    start.make_start()
+    goal.make_end()
+    return True
 
-        draw()
 
-        if current_node != start:
-            current_node.make_closed()
+class FrameThrottle():
+    """
+    Wraps a draw function so that calling it redraws at most
+    fps times per second. Returns the wrapped function's
+    result when it draws, and None otherwise.
+    """
+    def __init__(self, draw, fps=60):
+        self.draw = draw
+        self.interval = 1 / fps
+        self.last_frame = 0
 
-    return False
+    def __call__(self):
+        now = time.perf_counter()
+        if now - self.last_frame < self.interval:
+            return None
+        self.last_frame = now
+        return self.draw()
 
 
-def h(a, b):
+def manhattan(a, b):
     """
-    Heuristic function calculating Manhattan distance 
-    from point a to point b grid coordinates.
+    Heuristic function calculating Manhattan distance
+    from point a to point b grid coordinates. Admissible
+    only for 4-connected movement.
 
     See https://youtu.be/alU04hvz6L4?t=504 for more info
     on straight vs diagonal cost
@@ -72,24 +186,61 @@ def h(a, b):
       b: a tuple of a grid square coordinate for point b, for example (6, 6)
     Returns:
       h_cost: the estimated distance from point a to point b, for example (3, 3)
-      
+
     """
     a_x, a_y = a
     b_x, b_y = b
 
     x_distance = abs(a_x - b_x)
     y_distance = abs(a_y - b_y)
-    
+
     return x_distance + y_distance
 
 
-def reconstruct_path(current_node: GridSquare, draw):
+# The original name of the Manhattan heuristic
+h = manhattan
+
+
+def chebyshev(a, b):
+    """
+    Heuristic function calculating Chebyshev distance, the number
+    of king moves from point a to point b. Admissible for
+    8-connected movement where a diagonal step costs 1.
+    """
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+def octile(a, b):
+    """
+    Heuristic function calculating octile distance: diagonal steps
+    costing sqrt(2) until a and b share a row or column, then
+    straight steps. Admissible for octile movement.
+    """
+    x_distance = abs(a[0] - b[0])
+    y_distance = abs(a[1] - b[1])
+    return max(x_distance, y_distance) + (math.sqrt(2) - 1) * min(x_distance, y_distance)
+
+
+def zero(a, b):
+    """
+    Heuristic estimating nothing, which turns A* into Dijkstra's algorithm.
+    """
+    return 0
+
+
+# The admissible heuristic matching each movement model
+HEURISTICS = {
+    FOUR_CONNECTED: manhattan,
+    EIGHT_CONNECTED: chebyshev,
+    OCTILE: octile,
+}
+
+
+def reconstruct_path(grid: Grid, path: list, draw):
     """
-    Traverses the travelled path and reconstructs 
-    the optimal path from the current node using 
-    it's came_from_square 
+    Marks the cells along a found path, from
+    goal back to start, drawing after each one.
     """
-    while current_node.came_from_square != None:
-        current_node = current_node.came_from_square
-        current_node.make_path()
+    for row, column in reversed(path[1:-1]):
+        grid.set_state(grid.index(row, column), PATH)
         draw()
@@ -0,0 +1,78 @@
+"""
+Many-query pathfinding on one static grid.
+
+Routing thousands of agents over the same map repeats the same setup
+for every query. find_paths answers a whole list of (start, goal)
+pairs on one Grid, reusing its score buffers between queries: each
+search starts a new generation instead of refilling the buffers, so a
+short path costs time in proportion to the cells it visits, not to
+the size of the map.
+
+With processes set, the queries are split across a pool of worker
+processes, each given the walls once and keeping its own Grid.
+"""
+
+from multiprocessing import Pool
+
+from astar import find_path
+from grid import Grid, Movement, MOVEMENTS, OCTILE
+
+# Queries handed to a worker at a time
+CHUNK_SIZE = 64
+
+# The grid and search options of a worker process
+worker = {}
+
+
+def search_options(movement, heuristic):
+    """
+    Returns the keyword arguments for a search, leaving out the
+    heuristic when none was chosen, as not every search takes one.
+    """
+    options = {"movement": movement}
+    if heuristic is not None:
+        options["heuristic"] = heuristic
+    return options
+
+
+def init_worker(walls, rows, columns, movement, heuristic, search):
+    """
+    Builds the grid once per worker process. The movement model is
+    passed by its position in MOVEMENTS, since heuristics are looked
+    up by the model object itself.
+    """
+    worker.update(grid=Grid.from_walls(walls, rows, columns), search=search,
+                  options=search_options(MOVEMENTS[movement], heuristic))
+
+
+def worker_find_path(pair):
+    start, goal = pair
+    return worker["search"](worker["grid"], start, goal, **worker["options"])
+
+
+def find_paths(grid: Grid, pairs, movement: Movement = OCTILE, heuristic=None,
+               processes=None, search=find_path):
+    """
+    Finds a path for every (start, goal) pair of (row, column)
+    positions on the same grid.
+
+    Args:
+      grid: the Grid to search, which must not change during the batch
+      pairs: an iterable of (start, goal) pairs
+      movement: the Movement model, OCTILE by default
+      heuristic: h(a, b), by default the one matching the movement
+      processes: if given, the number of worker processes to spread
+        the queries over, or 0 for one per CPU
+      search: the search function, find_path by default, or another
+        with its signature such as jps.jump_point_search
+    Returns:
+      a list of SearchResults, or None where there is no path, in the
+      order of pairs
+    """
+    if processes is None:
+        options = search_options(movement, heuristic)
+        return [search(grid, start, goal, **options) for start, goal in pairs]
+
+    initargs = (bytes(grid.walls), grid.rows, grid.columns, MOVEMENTS.index(movement), heuristic, search)
+    with Pool(processes or None, initializer=init_worker, initargs=initargs) as pool:
+        return pool.map(worker_find_path, pairs, chunksize=CHUNK_SIZE)
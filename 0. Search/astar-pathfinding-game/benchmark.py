@@ -0,0 +1,377 @@
+"""
+Headless benchmark of the A* search on random-obstacle grids.
+
+Compares the heapq open set in astar.find_path against the previous
+queue.PriorityQueue version, whose frontier membership test scans the
+whole heap and then pushes duplicates anyway. The previous version is
+stopped after a time budget on large grids, so it is compared by
+expansion rate.
+
+With --models, instead compares each movement model's matching
+heuristic against Dijkstra's algorithm (no heuristic), which always
+finds the optimal cost, and against the Manhattan heuristic, which
+overestimates once diagonal moves are allowed.
+
+With --jps, compares plain A* against Jump Point Search under octile
+movement, which should find paths of the same cost in far fewer
+expansions on open maps. Scattered single-cell obstacles are its worst
+case, as nearly every cell has a forced neighbour; --layout blocks
+places rectangular obstacles instead, leaving long open runs.
+
+With --dynamic ROUNDS, moves obstacles for that many rounds, each
+blocking a cell on the current path and clearing a random barrier, and
+compares repairing the plan with D* Lite against replanning with A*.
+
+With --batch QUERIES, routes that many short trips (up to 50 cells
+apart) on the same grid, comparing a full reset of the score buffers
+before every query against batch.find_paths, which reuses them, on
+its own and across --processes worker processes.
+
+With --hierarchical QUERIES, routes that many trips anywhere on the
+grid with A* and with the HPA* layer in hpa.py, reporting the time to
+build the clusters, query times, how far HPA* paths are from optimal,
+and the cost of rebuilding after barriers change.
+
+Usage: python benchmark.py [--sizes 500 2000] [--density 0.2] [--layout cells]
+                           [--budget 10] [--seed 0] [--processes N] [--cluster-size 32]
+                           [--models | --jps | --dynamic ROUNDS | --batch QUERIES | --hierarchical QUERIES]
+"""
+
+import argparse
+import random
+import time
+from queue import PriorityQueue
+
+from astar import HEURISTICS, find_path, h, zero
+from batch import find_paths
+from grid import DIRECTIONS, EIGHT_CONNECTED, MOVEMENTS, Grid
+from dstar import DStarLite
+from hpa import CLUSTER_SIZE, HierarchicalGrid
+from jps import jump_point_search
+
+# Allowed difference between float path costs
+TOLERANCE = 1e-9
+
+
+def random_grid(rows, columns, density, seed):
+    """
+    Returns a walls buffer with roughly density of the cells blocked,
+    keeping the top-left and bottom-right corners open.
+    """
+    rng = random.Random(seed)
+    walls = bytearray(rng.random() < density for _ in range(rows * columns))
+    walls[0] = walls[-1] = 0
+    return walls
+
+
+def random_blocks(rows, columns, density, seed, largest=20):
+    """
+    Returns a walls buffer covered by random rectangles of up to
+    largest x largest cells, roughly density of the cells if they
+    did not overlap, keeping the top-left and bottom-right corners open.
+    """
+    rng = random.Random(seed)
+    walls = bytearray(rows * columns)
+    average_area = ((2 + largest) / 2) ** 2
+    for _ in range(int(rows * columns * density / average_area)):
+        height = rng.randint(2, min(largest, rows))
+        width = rng.randint(2, min(largest, columns))
+        top = rng.randrange(rows - height + 1)
+        left = rng.randrange(columns - width + 1)
+        for row in range(top, top + height):
+            walls[row * columns + left:row * columns + left + width] = bytes([1]) * width
+    walls[0] = walls[-1] = 0
+    return walls
+
+
+def priority_queue_find_path(walls, rows, columns, start, goal, budget):
+    """
+    The previous A* search, without drawing: a thread-safe PriorityQueue
+    open set and score dicts holding every square. Returns (path cost or
+    None, expansions, seconds), stopping after budget seconds.
+
+    Its membership test compared a square with the queue's (priority,
+    count, square) entries, so it never matched: it scanned the whole
+    queue and then pushed the neighbour again anyway. That is kept
+    here, so stale duplicate entries are popped and expanded too.
+    """
+    timer = time.perf_counter()
+    count = 0
+    expanded = 0
+    g_score = {(row, column): float("inf") for row in range(rows) for column in range(columns)}
+    g_score[start] = 0
+    f_score = {(row, column): float("inf") for row in range(rows) for column in range(columns)}
+    f_score[start] = h(start, goal)
+
+    frontier = PriorityQueue()
+    frontier.put((0, count, start))
+
+    while not frontier.empty():
+        if time.perf_counter() - timer > budget:
+            break
+        current = frontier.get()[2]
+        expanded += 1
+        if current == goal:
+            return g_score[goal], expanded, time.perf_counter() - timer
+
+        row, column = current
+        for d_row, d_column in DIRECTIONS:
+            neighbour = (row + d_row, column + d_column)
+            if not (0 <= neighbour[0] < rows and 0 <= neighbour[1] < columns) \
+                    or walls[neighbour[0] * columns + neighbour[1]]:
+                continue
+            temp_g_score = g_score[current] + 1
+            if temp_g_score < g_score[neighbour]:
+                g_score[neighbour] = temp_g_score
+                f_score[neighbour] = temp_g_score + h(neighbour, goal)
+                # Always true, as in the previous version
+                if neighbour not in frontier.queue:
+                    count += 1
+                    frontier.put((f_score[neighbour], count, neighbour))
+
+    return None, expanded, time.perf_counter() - timer
+
+
+def report(name, cost, expanded, seconds, finished=True):
+    rate = expanded / seconds if seconds > 0 else 0
+    status = f"cost {cost}" if finished else "stopped at time budget"
+    print(f"  {name:<15}{expanded:>12,} expanded{seconds:>10.3f} s{rate:>14,.0f} exp/s  {status}")
+
+
+def compare_models(grid, start, goal):
+    """
+    Searches the grid under every movement model with Dijkstra's
+    algorithm, the model's own heuristic and the Manhattan heuristic,
+    printing each path's cost, whether it is optimal and nodes expanded.
+    """
+    for movement in MOVEMENTS:
+        print(f"  {movement.name}:")
+        optimal = find_path(grid, start, goal, movement=movement, heuristic=zero)
+        heuristics = [zero, HEURISTICS[movement]]
+        if h not in heuristics:
+            heuristics.append(h)
+        for heuristic in heuristics:
+            name = "dijkstra" if heuristic is zero else heuristic.__name__
+            result = find_path(grid, start, goal, movement=movement, heuristic=heuristic)
+            if result is None:
+                print(f"    {name:<13}no path")
+                continue
+            status = "optimal" if abs(result.cost - optimal.cost) <= TOLERANCE \
+                else f"{result.cost / optimal.cost - 1:+.2%} over optimal"
+            print(f"    {name:<13}cost {result.cost:>12.3f}{result.expanded:>12,} expanded"
+                  f"{result.seconds:>10.3f} s  {status}")
+
+
+def compare_jump_points(grid, start, goal):
+    """
+    Searches the grid with plain A* and with Jump Point Search,
+    printing the cost, expansions and time of each.
+    """
+    astar_result = find_path(grid, start, goal)
+    jps_result = jump_point_search(grid, start, goal)
+    if astar_result is None or jps_result is None:
+        print(f"  A* {'no path' if astar_result is None else 'found a path'}, "
+              f"Jump Point Search {'no path' if jps_result is None else 'found a path'}")
+        return
+
+    for name, result in [("A*", astar_result), ("jump points", jps_result)]:
+        report(name, f"{result.cost:.3f}", result.expanded, result.seconds)
+    same = abs(astar_result.cost - jps_result.cost) <= TOLERANCE
+    print(f"  path costs {'match' if same else 'DIFFER'}, "
+          f"{astar_result.expanded / jps_result.expanded:,.1f}x fewer expansions, "
+          f"{astar_result.seconds / jps_result.seconds:,.1f}x faster")
+
+
+def compare_replanning(grid, start, goal, rounds, seed):
+    """
+    Edits barriers for a number of rounds, replanning after each with
+    a D* Lite repair and with a full A* search, and prints the mean
+    expansions and time of each and whether their path costs agreed.
+    """
+    rng = random.Random(seed)
+    planner = DStarLite(grid, start, goal)
+    result = planner.plan()
+    if result is None:
+        print("  no path")
+        return
+    report("initial plan", f"{result.cost:.3f}", result.expanded, result.seconds)
+
+    barriers = [index for index in range(grid.size) if grid.walls[index]]
+    totals = {"D* Lite": [0, 0.0], "A*": [0, 0.0]}
+    mismatches = 0
+    for _ in range(rounds):
+        if result is not None and len(result.path) > 2:
+            blocked = rng.choice(result.path[1:-1])
+            planner.set_barrier(blocked)
+            barriers.append(grid.index(*blocked))
+        if barriers:
+            cleared = barriers.pop(rng.randrange(len(barriers)))
+            planner.set_barrier(grid.position(cleared), False)
+
+        result = planner.plan()
+        full = find_path(grid, start, goal)
+        for name, outcome in [("D* Lite", result), ("A*", full)]:
+            if outcome is not None:
+                totals[name][0] += outcome.expanded
+                totals[name][1] += outcome.seconds
+        if (result is None) != (full is None) \
+                or (result is not None and abs(result.cost - full.cost) > TOLERANCE):
+            mismatches += 1
+
+    for name, (expanded, seconds) in totals.items():
+        print(f"  {name:<15}{expanded / rounds:>12,.0f} expanded{seconds / rounds * 1000:>10.3f} ms per replan")
+    print(f"  path costs {'match' if mismatches == 0 else f'DIFFER in {mismatches} rounds'}, "
+          f"{totals['A*'][1] / totals['D* Lite'][1]:,.1f}x faster over {rounds} rounds")
+
+
+def random_trips(walls, rows, columns, count, seed, reach=50):
+    """
+    Returns count (start, goal) pairs of open cells at most
+    reach rows and columns apart.
+    """
+    rng = random.Random(seed)
+    trips = []
+    while len(trips) < count:
+        start = (rng.randrange(rows), rng.randrange(columns))
+        goal = (min(max(start[0] + rng.randint(-reach, reach), 0), rows - 1),
+                min(max(start[1] + rng.randint(-reach, reach), 0), columns - 1))
+        if not walls[start[0] * columns + start[1]] and not walls[goal[0] * columns + goal[1]]:
+            trips.append((start, goal))
+    return trips
+
+
+def compare_batch(grid, trips, processes):
+    """
+    Times the trips searched one by one with the score buffers reset
+    before each, as every search used to, against find_paths.
+    """
+    timer = time.perf_counter()
+    reset = []
+    for start, goal in trips:
+        grid.clear_search()
+        reset.append(find_path(grid, start, goal))
+    runs = [("reset per query", reset, time.perf_counter() - timer)]
+
+    timer = time.perf_counter()
+    runs.append(("find_paths", find_paths(grid, trips), time.perf_counter() - timer))
+    if processes is not None:
+        timer = time.perf_counter()
+        runs.append((f"{processes or 'all'} processes", find_paths(grid, trips, processes=processes),
+                     time.perf_counter() - timer))
+
+    for name, results, seconds in runs:
+        found = [result for result in results if result is not None]
+        expanded = sum(result.expanded for result in found)
+        print(f"  {name:<17}{len(trips) / seconds:>10,.0f} queries/s{expanded / len(trips):>10,.0f} expanded per query"
+              f"  {len(found):,} paths")
+    same = all((a is None) == (b is None) and (a is None or abs(a.cost - b.cost) <= TOLERANCE)
+               for _, results, _ in runs[1:] for a, b in zip(reset, results))
+    print(f"  path costs {'match' if same else 'DIFFER'}")
+
+
+def compare_hierarchical(grid, trips, cluster_size, seed, edits=100):
+    """
+    Times the trips with A* and with HPA*, then edits barriers
+    and times the trips again with the affected clusters rebuilt.
+    """
+    optimal = []
+    timer = time.perf_counter()
+    for start, goal in trips:
+        optimal.append(find_path(grid, start, goal))
+    print(f"  {'A*':<22}{(time.perf_counter() - timer) / len(trips) * 1000:>10.1f} ms per query"
+          f"{sum(result.expanded for result in optimal if result) / len(trips):>12,.0f} expanded")
+
+    hierarchy = HierarchicalGrid(grid, cluster_size)
+    timer = time.perf_counter()
+    hierarchy.build()
+    print(f"  {'build':<22}{time.perf_counter() - timer:>10.2f} s for {len(hierarchy.clusters):,} clusters"
+          f" of {cluster_size}x{cluster_size}")
+
+    def query(name):
+        timer = time.perf_counter()
+        results = [hierarchy.find_path(start, goal) for start, goal in trips]
+        seconds = time.perf_counter() - timer
+        ratios = [result.cost / best.cost for result, best in zip(results, optimal)
+                  if result is not None and best is not None and best.cost > 0]
+        print(f"  {name:<22}{seconds / len(trips) * 1000:>10.1f} ms per query"
+              f"{sum(result.expanded for result in results if result) / len(trips):>12,.0f} expanded"
+              f"  cost {sum(ratios) / len(ratios) - 1:+.2%} mean, {max(ratios) - 1:+.2%} worst over optimal")
+
+    query("HPA*")
+
+    rng = random.Random(seed)
+    endpoints = {position for trip in trips for position in trip}
+    for _ in range(edits):
+        position = (rng.randrange(grid.rows), rng.randrange(grid.columns))
+        if position in endpoints:
+            continue
+        hierarchy.set_barrier(position, not grid.walls[grid.index(*position)])
+    print(f"  {edits} barrier edits left {len(hierarchy.clusters):,} clusters cached")
+    optimal = [find_path(grid, start, goal) for start, goal in trips]
+    query("HPA* after edits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark A* on random-obstacle grids.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--layout", choices=["cells", "blocks"], default="cells",
+                        help="scatter single-cell obstacles or rectangular blocks")
+    parser.add_argument("--budget", type=float, default=10,
+                        help="seconds allowed for the PriorityQueue version per grid")
+    parser.add_argument("--seed", type=int, default=0)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--models", action="store_true",
+                      help="compare heuristics and path costs across movement models")
+    mode.add_argument("--jps", action="store_true",
+                      help="compare plain A* against Jump Point Search")
+    mode.add_argument("--dynamic", type=int, metavar="ROUNDS",
+                      help="compare D* Lite repairs against A* replans as barriers move")
+    mode.add_argument("--batch", type=int, metavar="QUERIES",
+                      help="compare many short queries with and without buffer reuse")
+    mode.add_argument("--hierarchical", type=int, metavar="QUERIES",
+                      help="compare A* against hierarchical HPA* queries")
+    parser.add_argument("--cluster-size", type=int, default=CLUSTER_SIZE,
+                        help="with --hierarchical, the width of each cluster in cells")
+    parser.add_argument("--processes", type=int,
+                        help="with --batch, also spread the queries over this many processes (0 for all CPUs)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        layout = random_grid if args.layout == "cells" else random_blocks
+        walls = layout(size, size, args.density, args.seed)
+        start, goal = (0, 0), (size - 1, size - 1)
+        print(f"{size}x{size} grid, {args.density:.0%} obstacles ({args.layout}):")
+
+        if args.models:
+            compare_models(Grid.from_walls(walls, size, size), start, goal)
+            continue
+        if args.jps:
+            compare_jump_points(Grid.from_walls(walls, size, size), start, goal)
+            continue
+        if args.dynamic:
+            compare_replanning(Grid.from_walls(walls, size, size), start, goal, args.dynamic, args.seed)
+            continue
+        if args.hierarchical:
+            trips = random_trips(walls, size, size, args.hierarchical, args.seed, reach=size)
+            compare_hierarchical(Grid.from_walls(walls, size, size), trips, args.cluster_size, args.seed)
+            continue
+        if args.batch:
+            trips = random_trips(walls, size, size, args.batch, args.seed)
+            compare_batch(Grid.from_walls(walls, size, size), trips, args.processes)
+            continue
+
+        cost, expanded, seconds = priority_queue_find_path(walls, size, size, start, goal, args.budget)
+        report("PriorityQueue", cost, expanded, seconds, cost is not None or seconds < args.budget)
+
+        # Same movement and heuristic as the PriorityQueue version
+        result = find_path(Grid.from_walls(walls, size, size), start, goal,
+                           movement=EIGHT_CONNECTED, heuristic=h)
+        if result is None:
+            print("  heapq          no path")
+        else:
+            report("heapq", result.cost, result.expanded, result.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Incremental replanning with D* Lite.
+
+Rerunning A* after every barrier edit throws away all the work of the
+previous search. D* Lite keeps its scores between plans and, when told
+which cells changed, repairs only the scores those changes invalidate.
+It searches backwards from the goal, so the start can also move along
+the path (as an agent following it would) without starting over.
+
+Each cell keeps two estimates of its distance to the goal: g, the
+value from its last expansion, and rhs, a one-step lookahead computed
+from its neighbours' g values. Cells where they differ are
+"inconsistent" and wait in a priority queue until a plan fixes them.
+
+See Koenig and Likhachev, "D* Lite", AAAI 2002.
+"""
+
+import heapq
+import time
+from array import array
+
+from astar import HEURISTICS, SearchResult
+from grid import Grid, Movement, OCTILE, BARRIER, EMPTY, DIRECTIONS, INFINITY
+
+# Keys sum sqrt(2) step costs in different orders, so keys that are
+# equal may differ by rounding. Keys within this of the start's are
+# treated as ties and expanded, which is always safe.
+EPSILON = 1e-9
+
+
+class DStarLite():
+    """
+    Shortest path planner over a grid that is repaired, rather than
+    rerun, when barriers change. The grid is shared: after editing its
+    walls, pass the edited positions to cells_changed, or use
+    set_barrier to do both.
+
+      planner = DStarLite(grid, start, goal)
+      result = planner.plan()
+      planner.set_barrier((3, 4))
+      result = planner.plan()
+    """
+    def __init__(self, grid: Grid, start: tuple, goal: tuple,
+                 movement: Movement = OCTILE, heuristic=None):
+        self.grid = grid
+        self.movement = movement
+        self.heuristic = heuristic if heuristic is not None else HEURISTICS[movement]
+        self.start = grid.index(*start)
+        self.goal = grid.index(*goal)
+
+        # Offset added to keys whenever the start moves, so queued keys
+        # computed against earlier starts stay valid lower bounds
+        self.key_modifier = 0
+        self.last_start = self.start
+
+        # Each cell's moves as a list of (cell, cost), built when first
+        # needed and dropped when a barrier next to the cell changes
+        self.edges = {}
+
+        self.g = array("d", [INFINITY]) * grid.size
+        self.rhs = array("d", [INFINITY]) * grid.size
+        self.rhs[self.goal] = 0
+
+        # Heap of (k1, k2, count, index) entries, with each queued cell's
+        # current key. Entries whose key is no longer current are skipped.
+        self.frontier = []
+        self.keys = {}
+        self.count = 0
+        self.queue(self.goal)
+
+    def neighbours(self, index: int) -> list:
+        edges = self.edges.get(index)
+        if edges is None:
+            edges = self.edges[index] = list(self.grid.neighbours(index, self.movement))
+        return edges
+
+    def key(self, index: int) -> tuple:
+        grid = self.grid
+        estimate = min(self.g[index], self.rhs[index])
+        return (estimate + self.heuristic(grid.position(self.start), grid.position(index))
+                + self.key_modifier, estimate)
+
+    def queue(self, index: int):
+        key = self.key(index)
+        self.keys[index] = key
+        self.count += 1
+        heapq.heappush(self.frontier, (key[0], key[1], self.count, index))
+
+    def update_cell(self, index: int):
+        """
+        Recomputes a cell's lookahead from its neighbours and queues
+        the cell if it is now inconsistent.
+        """
+        if index != self.goal:
+            if self.grid.walls[index]:
+                self.rhs[index] = INFINITY
+            else:
+                g = self.g
+                self.rhs[index] = min((cost + g[neighbour] for neighbour, cost
+                                       in self.neighbours(index)), default=INFINITY)
+
+        if self.g[index] != self.rhs[index]:
+            self.queue(index)
+        else:
+            self.keys.pop(index, None)
+
+    def cells_changed(self, positions):
+        """
+        Accepts cell-change events: the (row, column) positions whose
+        walls were edited in the grid since the last plan. The edited
+        cells and the cells around them, whose moves may have been
+        opened or blocked, are updated.
+        """
+        grid = self.grid
+        affected = set()
+        for row, column in positions:
+            for d_row, d_column in [(0, 0)] + DIRECTIONS:
+                if 0 <= row + d_row < grid.rows and 0 <= column + d_column < grid.columns:
+                    affected.add(grid.index(row + d_row, column + d_column))
+        for index in affected:
+            self.edges.pop(index, None)
+        for index in affected:
+            self.update_cell(index)
+
+    def set_barrier(self, position: tuple, blocked: bool = True):
+        """
+        Adds or removes a barrier in the grid and updates the plan's
+        state to match.
+        """
+        self.grid.set_state(self.grid.index(*position), BARRIER if blocked else EMPTY)
+        self.cells_changed([position])
+
+    def move_start(self, position: tuple):
+        """
+        Moves the start, for example to the next cell on the path as
+        an agent follows it. Queued cells keep their priorities.
+        """
+        grid = self.grid
+        start = grid.index(*position)
+        self.key_modifier += self.heuristic(grid.position(self.last_start), position)
+        self.last_start = self.start = start
+
+    def repair(self) -> int:
+        """
+        Expands inconsistent cells until the start's distance to the
+        goal is known. Returns the number of cells expanded.
+        """
+        g = self.g
+        rhs = self.rhs
+        frontier = self.frontier
+        keys = self.keys
+        start = self.start
+        expanded = 0
+
+        while frontier:
+            k1, k2, _, index = frontier[0]
+            if keys.get(index) != (k1, k2):
+                heapq.heappop(frontier)
+                continue
+            start_k1, start_k2 = self.key(start)
+            if rhs[start] == g[start] and (k1 > start_k1 + EPSILON
+                                           or (k1 > start_k1 - EPSILON and k2 > start_k2 + EPSILON)):
+                break
+
+            heapq.heappop(frontier)
+            del keys[index]
+            new_key = self.key(index)
+            if (k1, k2) < new_key:
+                self.queue(index)
+                continue
+
+            expanded += 1
+            if g[index] > rhs[index]:
+                # The cell got closer to the goal, which can only lower
+                # its neighbours' lookaheads, so no need to recompute them
+                g[index] = rhs[index]
+                for neighbour, cost in self.neighbours(index):
+                    if neighbour != self.goal and cost + g[index] < rhs[neighbour]:
+                        rhs[neighbour] = cost + g[index]
+                        if g[neighbour] != rhs[neighbour]:
+                            self.queue(neighbour)
+                        else:
+                            keys.pop(neighbour, None)
+            else:
+                g[index] = INFINITY
+                self.update_cell(index)
+                for neighbour, _ in self.neighbours(index):
+                    self.update_cell(neighbour)
+
+        return expanded
+
+    def plan(self):
+        """
+        Repairs the plan after any changes and returns a SearchResult
+        for the path from the current start, or None if there is none.
+        expanded counts only the cells expanded by this repair.
+        """
+        timer = time.perf_counter()
+        expanded = self.repair()
+        if self.g[self.start] == INFINITY:
+            return None
+
+        # Each cell's best move is to the neighbour minimising cost plus g
+        grid = self.grid
+        g = self.g
+        current = self.start
+        path = [grid.position(current)]
+        while current != self.goal:
+            current = min(self.neighbours(current),
+                          key=lambda neighbour: neighbour[1] + g[neighbour[0]])[0]
+            path.append(grid.position(current))
+        return SearchResult(path, g[self.start], expanded, time.perf_counter() - timer)
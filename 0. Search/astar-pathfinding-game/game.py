@@ -1,30 +1,87 @@
+import argparse
 import pygame
+import maps
+from grid import Grid, EMPTY, BARRIER, PATH, MOVEMENTS, OCTILE
 from gridsquare import GridSquare
 from colors import colors
-from astar import astar_search
+from astar import astar_search, FrameThrottle
+from jps import jump_point_search
+from dstar import DStarLite
 
 WIDTH = 800
 WINDOW = pygame.display.set_mode((WIDTH, WIDTH))
 pygame.display.set_caption("A* Path Finding Algorithm")
 
+# Where 's' saves the grid as a text map unless told otherwise
+SAVE_PATH = "map.txt"
 
-def make_grid(rows: int, width: float) -> list[list[GridSquare]]:
+# Squares narrower than this many pixels are drawn without gridlines
+MIN_GRIDLINE_GAP = 4
+
+
+def set_caption(movement, jump_points=False, replanning=False):
     """
-    Creates the game grid as a 2D array of 
-    GridSquare objects.
+    Shows the current movement model, and whether Jump Point
+    Search and replanning are on, in the window title.
     """
-    grid = []
-    gap = width // rows
-    for i in range(rows):
-        grid.append([])
-        for j in range(rows):
-            square = GridSquare(row=i, 
-                                column=j,
-                                width=gap,
-                                total_rows=rows)
-            grid[i].append(square)
-    
-    return grid
+    modes = [movement.name]
+    if jump_points:
+        modes.append("jump points")
+    if replanning:
+        modes.append("replanning")
+    pygame.display.set_caption(f"A* Path Finding Algorithm ({', '.join(modes)})")
+
+
+def make_grid(rows: int, width: float) -> Grid:
+    """
+    Creates the game grid as a compact Grid model
+    with rows x rows cells, all initially empty.
+    """
+    return Grid(rows)
+
+
+def transpose(position):
+    return position and (position[1], position[0])
+
+
+def load_map(path):
+    """
+    Loads a MovingAI .map or text map file into a square
+    game grid, filling any space beyond a non-square map
+    with barriers. Returns (grid, start, goal) positions.
+
+    The game draws a square's row across the window and its
+    column down it, so the map is transposed to show its
+    lines as lines on screen.
+    """
+    loaded, start, goal = maps.load(path)
+    rows = max(loaded.rows, loaded.columns)
+    grid = Grid(rows)
+    for row in range(rows):
+        for column in range(rows):
+            if row >= loaded.rows or column >= loaded.columns or loaded.walls[loaded.index(row, column)]:
+                grid.set_state(grid.index(column, row), BARRIER)
+    return grid, transpose(start), transpose(goal)
+
+
+def save_map(grid: Grid, path, start=None, goal=None):
+    """
+    Saves the grid as a text map as it appears on screen,
+    transposing it back as load_map transposed it.
+    """
+    saved = Grid(grid.columns, grid.rows)
+    for row in range(grid.rows):
+        for column in range(grid.columns):
+            if grid.walls[grid.index(row, column)]:
+                saved.set_state(saved.index(column, row), BARRIER)
+    maps.write_text(saved, path, transpose(start), transpose(goal))
+
+
+def get_square(grid: Grid, row: int, column: int, rows: int, width: float) -> GridSquare:
+    """
+    Returns a drawable view of the grid square at (row, column).
+    """
+    return GridSquare(grid, row, column, width // rows)
 
 
 def draw_gridlines(window, rows, width):
@@ -33,28 +90,117 @@ def draw_gridlines(window, rows, width):
     and vertical line on the grid.
     """
     gap = width // rows
+    if gap < MIN_GRIDLINE_GAP:
+        return
     for i in range(rows):
         pygame.draw.line(window, colors["GRAY"], (0, i * gap), (width, i * gap))
-        for j in range(rows):
-            pygame.draw.line(window, colors["GRAY"], (j * gap, 0), (j * gap, width))
+        pygame.draw.line(window, colors["GRAY"], (i * gap, 0), (i * gap, width))
 
 
-def draw(window, grid, rows, width):
+def draw(window, grid, rows, width, gridlines=None):
     """
-    Draw the grid at every frame. Paints the 
-    canvas white then redraws the grid squares
-    with their current state and the gridlines
+    Draw the whole grid. Paints the canvas white
+    then redraws the non-empty grid squares with their
+    current state and the gridlines, blitting them from
+    a pre-rendered gridlines surface if one is given
     """
     window.fill(colors["WHITE"])
 
-    for row in grid:
-        for square in row:
-            square.draw(window)
+    for index, state in enumerate(grid.state):
+        if state != EMPTY:
+            row, column = grid.position(index)
+            get_square(grid, row, column, rows, width).draw(window)
 
-    draw_gridlines(window, rows, width)
+    if gridlines is None:
+        draw_gridlines(window, rows, width)
+    else:
+        window.blit(gridlines, (0, 0))
     pygame.display.update()
 
 
+class Renderer():
+    """
+    Draws the grid each frame by redrawing only the squares
+    whose state changed since the last frame, found by comparing
+    the grid's states with a copy of those last shown, and
+    updating just their rects on screen. The gridlines are
+    pre-rendered once to a transparent surface and blitted back
+    over each redrawn square.
+    """
+    def __init__(self, window, grid: Grid, rows: int, width: int):
+        self.window = window
+        self.rows = rows
+        self.width = width
+        self.gridlines = pygame.Surface((width, width), pygame.SRCALPHA)
+        draw_gridlines(self.gridlines, rows, width)
+        self.reset(grid)
+
+    def reset(self, grid: Grid):
+        """
+        Switches to a new grid, redrawing the
+        whole window on the next frame.
+        """
+        self.grid = grid
+        self.shown = None
+
+    def draw(self):
+        grid = self.grid
+        if self.shown is None:
+            draw(self.window, grid, self.rows, self.width, self.gridlines)
+            self.shown = bytearray(grid.state)
+            return
+
+        # Compare a row at a time so unchanged rows cost one comparison
+        columns = grid.columns
+        state = grid.state
+        shown = self.shown
+        rects = []
+        for row in range(grid.rows):
+            start = row * columns
+            end = start + columns
+            if state[start:end] == shown[start:end]:
+                continue
+            for column in range(columns):
+                if state[start + column] != shown[start + column]:
+                    square = get_square(grid, row, column, self.rows, self.width)
+                    square.draw(self.window)
+                    rect = pygame.Rect(square.x, square.y, square.width, square.width)
+                    self.window.blit(self.gridlines, rect, rect)
+                    rects.append(rect)
+            shown[start:end] = state[start:end]
+
+        if len(rects) > grid.size // 4:
+            pygame.display.update()
+        elif rects:
+            pygame.display.update(rects)
+
+
+def show_plan(grid, planner):
+    """
+    Repairs an incremental plan after barrier edits
+    and marks its path, clearing the previous one.
+    """
+    grid.clear_marks()
+    result = planner.plan()
+    if result is not None:
+        for row, column in result.path[1:-1]:
+            grid.set_state(grid.index(row, column), PATH)
+
+
+def draw_search_step(renderer):
+    """
+    Redraws the grid while a search is running. Returns
+    False to abort the search if the window was closed.
+    """
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            pygame.event.post(event)
+            return False
+
+    renderer.draw()
+    return True
+
+
 def get_clicked_square(position, rows, width):
     """
     Determines what grid square was clicked on
@@ -68,20 +214,39 @@ def get_clicked_square(position, rows, width):
     return row, column
         
 
-def main(window, width):
+def main(window, width, map_path=None, save_path=SAVE_PATH):
     rows = 50
     grid = make_grid(rows, width)
     start: GridSquare = None
     end: GridSquare = None
+    if map_path:
+        grid, start_position, end_position = load_map(map_path)
+        rows = grid.rows
+        if rows > width:
+            # Keep squares at least a pixel wide on large maps
+            width = rows
+            window = pygame.display.set_mode((width, width))
+        if start_position:
+            start = get_square(grid, *start_position, rows, width)
+            start.make_start()
+        if end_position:
+            end = get_square(grid, *end_position, rows, width)
+            end.make_end()
+    renderer = Renderer(window, grid, rows, width)
     game_is_running = True
     search_algorithm_is_running = False
+    movement = OCTILE
+    jump_points = False
+    replanning = False
+    planner: DStarLite = None
+    set_caption(movement, jump_points, replanning)
 
     while game_is_running:
-        draw(window, grid, rows, width)
+        renderer.draw()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                run = False
+                game_is_running = False
 
             if search_algorithm_is_running:
                 continue
@@ -89,41 +254,86 @@ def main(window, width):
             if pygame.mouse.get_pressed()[0]:
                 mouse_position = pygame.mouse.get_pos()
                 row, column = get_clicked_square(mouse_position, rows, width)
-                square: GridSquare = grid[row][column]
+                if row >= rows or column >= rows:
+                    continue
+                square: GridSquare = get_square(grid, row, column, rows, width)
                 if not start and square != end:
                     start = square
                     start.make_start()
                 elif not end and square != start:
                     end = square
                     end.make_end()
-                elif square != end and square != start:
+                elif square != end and square != start and not square.is_barrier():
                     square.make_barrier()
+                    if planner:
+                        planner.cells_changed([square.get_position()])
+                        show_plan(grid, planner)
             elif pygame.mouse.get_pressed()[2]:
                 mouse_position = pygame.mouse.get_pos()
                 row, column = get_clicked_square(mouse_position, rows, width)
-                square: GridSquare = grid[row][column]
+                if row >= rows or column >= rows:
+                    continue
+                square: GridSquare = get_square(grid, row, column, rows, width)
+                was_barrier = square.is_barrier()
                 square.reset()
                 if square == start:
                     start = None
+                    planner = None
                 
                 if square == end:
                     end = None
+                    planner = None
+
+                if planner and was_barrier:
+                    planner.cells_changed([square.get_position()])
+                    show_plan(grid, planner)
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    for row in grid:
-                        for square in row:
-                            square.update_neighbours(grid)
+                # With replanning on, the path found is kept up
+                # to date as barriers are added and removed
+                if event.key == pygame.K_SPACE and start and end and replanning:
+                    planner = DStarLite(grid, start.get_position(), end.get_position(), movement)
+                    show_plan(grid, planner)
+                elif event.key == pygame.K_SPACE and start and end:
+                    draw_step = FrameThrottle(lambda: draw_search_step(renderer))
+                    search = jump_point_search if jump_points else None
+                    astar_search(draw_step, grid, start, end, movement, search)
+
+                # Jump Point Search only supports octile movement
+                if event.key == pygame.K_m:
+                    movement = MOVEMENTS[(MOVEMENTS.index(movement) + 1) % len(MOVEMENTS)]
+                    jump_points = jump_points and movement is OCTILE
+                    planner = None
+                    set_caption(movement, jump_points, replanning)
+
+                if event.key == pygame.K_j:
+                    jump_points = not jump_points
+                    movement = OCTILE
+                    planner = None
+                    set_caption(movement, jump_points, replanning)
+
+                if event.key == pygame.K_r:
+                    replanning = not replanning
+                    planner = None
+                    set_caption(movement, jump_points, replanning)
 
-                    astar_search(lambda: draw(window, grid, rows, width), grid, start, end)
+                if event.key == pygame.K_s:
+                    save_map(grid, save_path, start and start.get_position(), end and end.get_position())
+                    print(f"Saved the grid to {save_path}")
 
                 if event.key == pygame.K_c:
                     start = None
                     end = None 
+                    planner = None
                     grid = make_grid(rows, width)
+                    renderer.reset(grid)
             
     pygame.quit()
 
 
 if __name__ == "__main__":
-    main(WINDOW, WIDTH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Visualise A* path finding.")
+    parser.add_argument("map", nargs="?", help="MovingAI .map or text map file to start from")
+    parser.add_argument("--save", default=SAVE_PATH, help="text map file the 's' key saves to")
+    args = parser.parse_args()
+    main(WINDOW, WIDTH, args.map, args.save)
\ No newline at end of file
@@ -0,0 +1,192 @@
+import math
+from array import array
+
+# Cell states, stored one byte per cell
+EMPTY = 0
+BARRIER = 1
+START = 2
+END = 3
+OPEN = 4
+CLOSED = 5
+PATH = 6
+
+# States left behind by a search, cleared before the next one
+SEARCH_STATES = (OPEN, CLOSED, PATH)
+
+# Translation table mapping search states back to EMPTY
+CLEAR_SEARCH_TABLE = bytes(EMPTY if state in SEARCH_STATES else state for state in range(256))
+
+# Translation table mapping any non-zero byte to a wall
+WALL_TABLE = bytes([0]) + bytes([1]) * 255
+
+# Offsets of the eight cells surrounding a cell, straight moves first
+DIRECTIONS = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, -1), (-1, 1), (1, 1), (1, -1)]
+
+INFINITY = float("inf")
+
+# Largest generation a 4-byte unsigned stamp can hold before they are all reset
+MAX_GENERATION = 2 ** 32 - 1
+
+
+class Movement():
+    """
+    A movement model: which of the surrounding cells can be moved
+    to, what a diagonal step costs, and whether a diagonal step may
+    cut the corner of a barrier next to it.
+    """
+    def __init__(self, name, directions, diagonal_cost, corner_cutting):
+        self.name = name
+        self.directions = directions
+        self.diagonal_cost = diagonal_cost
+        self.corner_cutting = corner_cutting
+
+    def __repr__(self):
+        return f"Movement({self.name!r})"
+
+
+# Up, down, left and right only, each costing 1
+FOUR_CONNECTED = Movement("4-connected", DIRECTIONS[:4], None, False)
+
+# All eight directions at a cost of 1, cutting corners freely
+EIGHT_CONNECTED = Movement("8-connected", DIRECTIONS, 1, True)
+
+# All eight directions with diagonals costing sqrt(2), never cutting
+# a barrier's corner, as in the MovingAI grid benchmarks
+OCTILE = Movement("octile", DIRECTIONS, math.sqrt(2), False)
+
+MOVEMENTS = [FOUR_CONNECTED, EIGHT_CONNECTED, OCTILE]
+
+
+class Grid():
+    """
+    Compact grid model. Cells are numbered row-major, so cell
+    row * columns + column holds the square at (row, column), and
+    all per-cell data lives in flat arrays indexed by that number:
+
+      state: the cell's display state (EMPTY, BARRIER, START, ...)
+      walls: 1 where the cell is a barrier, 0 otherwise
+      g_score, f_score: A* scores from the last search
+      parent: the previous cell on the best path found, or -1
+      stamp: the search generation that last set the cell's scores
+
+    Starting a search bumps the generation rather than refilling the
+    score arrays, so scores and parents only count where stamp equals
+    generation, and unstamped cells are unvisited. Walls should be
+    edited through set_state, which keeps derived copies up to date.
+    """
+    def __init__(self, rows: int, columns: int = None):
+        self.rows = rows
+        self.columns = columns if columns is not None else rows
+        self.size = self.rows * self.columns
+        self.state = bytearray(self.size)
+        self.walls = bytearray(self.size)
+        self.g_score = array("d", [INFINITY]) * self.size
+        self.f_score = array("d", [INFINITY]) * self.size
+        self.parent = array("l", [-1]) * self.size
+        self.stamp = array("I", [0]) * self.size
+        self.generation = 0
+
+        # Walls stored column by column, built when first needed
+        self._walls_by_column = None
+
+        # Per movement model, the index offset, row and column offsets
+        # and cost of each step
+        self.steps = {}
+
+    @classmethod
+    def from_walls(cls, walls, rows: int, columns: int):
+        """
+        Builds a grid from a flat row-major buffer of walls,
+        where non-zero cells are barriers.
+        """
+        grid = cls(rows, columns)
+        grid.walls[:] = bytes(walls).translate(WALL_TABLE)
+        grid.state[:] = bytes(grid.walls).translate(bytes([EMPTY, BARRIER]) + bytes(254))
+        return grid
+
+    def new_search(self) -> int:
+        """
+        Invalidates every cell's scores in O(1) by starting a new
+        generation, and returns it.
+        """
+        if self.generation == MAX_GENERATION:
+            self.stamp[:] = array("I", [0]) * self.size
+            self.generation = 0
+        self.generation += 1
+        return self.generation
+
+    def walls_by_column(self) -> bytearray:
+        """
+        Returns the walls in column-major order, so that a column's
+        cells are contiguous like a row's.
+        """
+        if self._walls_by_column is None:
+            walls_by_column = bytearray(self.size)
+            for column in range(self.columns):
+                walls_by_column[column * self.rows:(column + 1) * self.rows] = self.walls[column::self.columns]
+            self._walls_by_column = walls_by_column
+        return self._walls_by_column
+
+    def index(self, row: int, column: int) -> int:
+        return row * self.columns + column
+
+    def position(self, index: int) -> tuple:
+        return divmod(index, self.columns)
+
+    def set_state(self, index: int, state: int):
+        self.state[index] = state
+        wall = state == BARRIER
+        if self.walls[index] != wall:
+            self.walls[index] = wall
+            self._walls_by_column = None
+
+    def neighbours(self, index: int, movement: Movement = OCTILE):
+        """
+        Yields (cell, cost) for each open cell reachable in one step
+        from a cell under a movement model, by index arithmetic.
+        """
+        steps = self.steps.get(movement)
+        if steps is None:
+            steps = self.steps[movement] = [
+                (d_row * self.columns + d_column, d_row, d_column,
+                 movement.diagonal_cost if d_row and d_column else 1)
+                for d_row, d_column in movement.directions
+            ]
+
+        columns = self.columns
+        row, column = divmod(index, columns)
+        walls = self.walls
+        for offset, d_row, d_column, cost in steps:
+            if not (0 <= row + d_row < self.rows and 0 <= column + d_column < columns) \
+                    or walls[index + offset]:
+                continue
+            if d_row and d_column and not movement.corner_cutting \
+                    and (walls[index + d_row * columns] or walls[index + d_column]):
+                continue
+            yield index + offset, cost
+
+    def clear_search(self):
+        """
+        Resets scores and parents, and clears the open, closed
+        and path markings of the previous search.
+        """
+        self.g_score[:] = array("d", [INFINITY]) * self.size
+        self.f_score[:] = array("d", [INFINITY]) * self.size
+        self.parent[:] = array("l", [-1]) * self.size
+        self.new_search()
+        self.clear_marks()
+
+    def clear_marks(self):
+        """
+        Clears the open, closed and path markings, leaving scores as they are.
+        """
+        self.state[:] = self.state.translate(CLEAR_SEARCH_TABLE)
+
+    def clear(self):
+        """
+        Resets every cell to empty.
+        """
+        self.clear_search()
+        self.state[:] = bytes(self.size)
+        self.walls[:] = bytes(self.size)
+        self._walls_by_column = None
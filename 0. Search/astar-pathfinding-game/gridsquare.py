@@ -1,104 +1,93 @@
 import pygame
 from colors import colors
+from grid import Grid, EMPTY, BARRIER, START, END, OPEN, CLOSED, PATH
+
+# Colour each cell state is drawn in
+STATE_COLORS = {
+    EMPTY: colors["WHITE"],
+    BARRIER: colors["BLACK"],
+    START: colors["ORANGE"],
+    END: colors["TURQUOISE"],
+    OPEN: colors["GREEN"],
+    CLOSED: colors["RED"],
+    PATH: colors["PURPLE"],
+}
+
 
 class GridSquare():
-    def __init__(self, row, column, width, total_rows):
+    """
+    View of one cell of a Grid for drawing and mouse handling.
+    The cell's state lives in the grid, so views are cheap to
+    create and two views of the same cell compare equal.
+    """
+    def __init__(self, grid: Grid, row, column, width):
+        self.grid = grid
         self.row = row
-        self.column = column  
-        self.x = row * width 
+        self.column = column
+        self.index = grid.index(row, column)
+        self.x = row * width
         self.y = column * width
-        self.color = colors["WHITE"]
-        self.neighbours = []
-        self.width = width 
-        self.total_rows = total_rows 
-        self.came_from_square: GridSquare = None
+        self.width = width
+
+    @property
+    def color(self):
+        return STATE_COLORS[self.grid.state[self.index]]
+
+    @property
+    def neighbours(self):
+        columns = self.grid.columns
+        return [GridSquare(self.grid, *divmod(index, columns), self.width)
+                for index, _ in self.grid.neighbours(self.index)]
 
     def get_position(self):
         return self.row, self.column
 
     def is_closed(self):
-        return self.color == colors["RED"]
+        return self.grid.state[self.index] == CLOSED
 
     def is_open(self):
-        return self.color == colors["GREEN"]
+        return self.grid.state[self.index] == OPEN
 
     def is_barrier(self):
-        return self.color == colors["BLACK"]
+        return self.grid.state[self.index] == BARRIER
 
     def is_start(self):
-        return self.color == colors["ORANGE"]
+        return self.grid.state[self.index] == START
 
     def is_end(self):
-        return self.color == colors["TURQUOISE"]
+        return self.grid.state[self.index] == END
 
     def make_start(self):
-        self.color = colors["ORANGE"]
+        self.grid.set_state(self.index, START)
 
     def reset(self):
-        self.color = colors["WHITE"]
+        self.grid.set_state(self.index, EMPTY)
 
     def make_closed(self):
-        self.color = colors["RED"]
+        self.grid.set_state(self.index, CLOSED)
 
     def make_open(self):
-        self.color = colors["GREEN"]
+        self.grid.set_state(self.index, OPEN)
 
     def make_barrier(self):
-        self.color = colors["BLACK"]
+        self.grid.set_state(self.index, BARRIER)
 
     def make_end(self):
-        self.color = colors["TURQUOISE"]
+        self.grid.set_state(self.index, END)
 
     def make_path(self):
-        self.color = colors["PURPLE"]
+        self.grid.set_state(self.index, PATH)
 
     def draw(self, window):
         pygame.draw.rect(window, self.color, (self.x, self.y, self.width, self.width))
 
-    def update_neighbours(self, grid):
-        self.neighbours = []
-
-        # UP
-        if self.row > 0 and not grid[self.row - 1][self.column].is_barrier(): 
-            self.neighbours.append(grid[self.row - 1][self.column])
-
-        # DOWN
-        if self.row < self.total_rows - 1 and not grid[self.row + 1][self.column].is_barrier(): 
-            self.neighbours.append(grid[self.row + 1][self.column])
-
-        # RIGHT
-        if self.column < self.total_rows - 1 and not grid[self.row][self.column + 1].is_barrier(): 
-            self.neighbours.append(grid[self.row][self.column + 1])
-
-        # LEFT
-        if self.column > 0 and not grid[self.row][self.column - 1].is_barrier(): 
-            self.neighbours.append(grid[self.row][self.column - 1])
-
-        # UP LEFT
-        if self.row > 0 and self.column > 0 \
-            and not grid[self.row - 1][self.column - 1].is_barrier():
-            self.neighbours.append(grid[self.row - 1][self.column - 1])
-
-        # UP RIGHT
-        if self.row > 0 and self.column < self.total_rows - 1 \
-            and not grid[self.row - 1][self.column + 1].is_barrier():
-            self.neighbours.append(grid[self.row - 1][self.column + 1])
-
-        # DOWN RIGHT 
-        if self.row < self.total_rows - 1 \
-            and self.column < self.total_rows - 1 \
-            and not grid[self.row + 1][self.column + 1].is_barrier(): 
-            self.neighbours.append(grid[self.row + 1][self.column + 1])
-
-        # DOWN LEFT
-        if self.row < self.total_rows - 1 \
-            and self.column > 0 \
-            and not grid[self.row + 1][self.column -1].is_barrier():
-            self.neighbours.append(grid[self.row + 1][self.column -1])
-
-
-
+    def __eq__(self, another_grid_square):
+        return isinstance(another_grid_square, GridSquare) \
+            and self.grid is another_grid_square.grid \
+            and self.index == another_grid_square.index
 
+    def __hash__(self):
+        return hash((id(self.grid), self.index))
 
     def __lt__(self, another_grid_square):
         return False
\ No newline at end of file
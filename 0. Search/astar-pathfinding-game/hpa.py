@@ -0,0 +1,345 @@
+"""
+Hierarchical path-finding (HPA*) for large grids.
+
+The grid is divided into square clusters. Where open cells line up
+across the border between two clusters, transition cells are placed on
+either side, and within each cluster the distances between its
+transition cells are found by a search confined to the cluster. This
+small abstract graph of transition cells is searched first, and each
+of its edges is then refined back into grid cells.
+
+Paths are near-optimal rather than optimal, as they can only cross
+borders at transition cells, but a query on a large map visits a few
+cells per cluster instead of every cell in its way. Clusters and
+borders are worked out the first time a query reaches them and cached.
+When barriers change, only the clusters and borders touching the
+changed cells are dropped from the cache.
+
+See Botea, Müller and Schaeffer, "Near Optimal Hierarchical
+Path-Finding", Journal of Game Development, 2004.
+"""
+
+import heapq
+import time
+
+from astar import HEURISTICS, SearchResult
+from grid import Grid, Movement, OCTILE, BARRIER, EMPTY, INFINITY
+
+CLUSTER_SIZE = 32
+
+# Runs of open border cells at least this long get a transition at
+# each end, shorter runs a single transition in the middle
+LONG_ENTRANCE = 6
+
+
+class HierarchicalGrid():
+    """
+    HPA* layer over a Grid. Edit the grid's walls through set_barrier,
+    or pass the edited positions to cells_changed, so that the cached
+    clusters stay up to date.
+
+      hierarchy = HierarchicalGrid(grid)
+      result = hierarchy.find_path((0, 0), (4095, 4095))
+    """
+    def __init__(self, grid: Grid, cluster_size: int = CLUSTER_SIZE, movement: Movement = OCTILE):
+        # Borders are only crossed straight, which loses no paths unless
+        # diagonal steps can squeeze between two barriers
+        if movement.corner_cutting:
+            raise ValueError(f"Hierarchical search needs movement without corner cutting, not {movement.name}")
+
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.movement = movement
+        self.heuristic = HEURISTICS[movement]
+        self.cluster_rows = -(-grid.rows // cluster_size)
+        self.cluster_columns = -(-grid.columns // cluster_size)
+
+        # Transitions across the border between two clusters, keyed by
+        # the pair of clusters with the top or left one first, as a
+        # list of (cell, cell) pairs in the same order
+        self.borders = {}
+
+        # For each cluster, its transition cells' moves to other clusters,
+        # as in entrances, and distances to the cluster's other
+        # transition cells, as in cluster_edges
+        self.cluster_entrances = {}
+        self.clusters = {}
+
+    def build(self):
+        """
+        Works out every cluster up front, rather than
+        the first time a query reaches each one.
+        """
+        for cluster_row in range(self.cluster_rows):
+            for cluster_column in range(self.cluster_columns):
+                self.cluster_edges((cluster_row, cluster_column))
+
+    def cluster_of(self, index: int) -> tuple:
+        row, column = divmod(index, self.grid.columns)
+        return row // self.cluster_size, column // self.cluster_size
+
+    def bounds(self, cluster: tuple) -> tuple:
+        """
+        Returns the (top, bottom, left, right) rows and columns
+        a cluster covers, with bottom and right exclusive.
+        """
+        top = cluster[0] * self.cluster_size
+        left = cluster[1] * self.cluster_size
+        return (top, min(top + self.cluster_size, self.grid.rows),
+                left, min(left + self.cluster_size, self.grid.columns))
+
+    def adjacent_clusters(self, cluster: tuple) -> list:
+        cluster_row, cluster_column = cluster
+        return [(cluster_row + d_row, cluster_column + d_column)
+                for d_row, d_column in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                if 0 <= cluster_row + d_row < self.cluster_rows
+                and 0 <= cluster_column + d_column < self.cluster_columns]
+
+    def border(self, first: tuple, second: tuple) -> list:
+        """
+        Returns the transitions across the border between two adjacent
+        clusters, with first above or left of second, finding them in
+        each run of open cell pairs facing each other on the border.
+        """
+        transitions = self.borders.get((first, second))
+        if transitions is not None:
+            return transitions
+
+        grid = self.grid
+        top, bottom, left, right = self.bounds(first)
+        if first[0] == second[0]:
+            # Side by side: pairs of cells in the first cluster's last
+            # column and the second's first
+            pairs = [(grid.index(row, right - 1), grid.index(row, right)) for row in range(top, bottom)]
+        else:
+            pairs = [(grid.index(bottom - 1, column), grid.index(bottom, column)) for column in range(left, right)]
+
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and not grid.walls[pair[0]] and not grid.walls[pair[1]]:
+                run.append(pair)
+                continue
+            if len(run) >= LONG_ENTRANCE:
+                transitions.extend([run[0], run[-1]])
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        self.borders[(first, second)] = transitions
+        return transitions
+
+    def entrances(self, cluster: tuple) -> dict:
+        """
+        Returns a dict mapping each transition cell in a cluster to a
+        list of (cell, cost) moves across the border to other clusters.
+        """
+        entrances = self.cluster_entrances.get(cluster)
+        if entrances is not None:
+            return entrances
+
+        entrances = {}
+        for other in self.adjacent_clusters(cluster):
+            if other < cluster:
+                transitions = [(inside, outside) for outside, inside in self.border(other, cluster)]
+            else:
+                transitions = self.border(cluster, other)
+            for inside, outside in transitions:
+                entrances.setdefault(inside, []).append((outside, 1))
+
+        self.cluster_entrances[cluster] = entrances
+        return entrances
+
+    def cluster_edges(self, cluster: tuple) -> dict:
+        """
+        Returns a dict mapping each transition cell in a cluster to a
+        list of (cell, cost) distances to the cluster's other transition
+        cells, searching within the cluster the first time it is needed.
+        """
+        edges = self.clusters.get(cluster)
+        if edges is not None:
+            return edges
+
+        cells = list(self.entrances(cluster))
+        edges = {cell: [] for cell in cells}
+        moves = {}
+        for i, cell in enumerate(cells):
+            distances, _ = self.local_search(cell, cluster, cells[i + 1:], moves)
+            for other, distance in distances.items():
+                edges[cell].append((other, distance))
+                edges[other].append((cell, distance))
+
+        self.clusters[cluster] = edges
+        return edges
+
+    def local_search(self, source: int, cluster: tuple, targets, moves=None, guided=False) -> tuple:
+        """
+        Dijkstra's algorithm from a cell, confined to a cluster, until
+        every target's distance is known. Returns (distances, parents),
+        where distances maps each reachable target to its distance and
+        parents maps each cell visited to the cell before it.
+
+        moves, if given, is a dict caching each cell's (cell, cost)
+        moves within the cluster, shared by searches in the same cluster.
+        With guided set and a single target, searches with A* instead.
+        """
+        if moves is None:
+            moves = {}
+        grid = self.grid
+        columns = grid.columns
+        top, bottom, left, right = self.bounds(cluster)
+        remaining = set(targets)
+        remaining.discard(source)
+
+        if guided:
+            goal = grid.position(next(iter(remaining)))
+            heuristic = self.heuristic
+        scores = {source: 0}
+        parents = {source: -1}
+        distances = {}
+        frontier = [(0, 0, source)]
+        while frontier and remaining:
+            _, score, current = heapq.heappop(frontier)
+            if score > scores[current]:
+                continue
+            if current in remaining:
+                remaining.discard(current)
+                distances[current] = score
+
+            steps = moves.get(current)
+            if steps is None:
+                steps = moves[current] = [
+                    (neighbour, cost) for neighbour, cost in grid.neighbours(current, self.movement)
+                    if top <= neighbour // columns < bottom and left <= neighbour % columns < right
+                ]
+            for neighbour, cost in steps:
+                if score + cost < scores.get(neighbour, INFINITY):
+                    scores[neighbour] = score + cost
+                    parents[neighbour] = current
+                    priority = score + cost + heuristic(divmod(neighbour, columns), goal) if guided else score + cost
+                    heapq.heappush(frontier, (priority, score + cost, neighbour))
+
+        return distances, parents
+
+    def local_path(self, source: int, target: int) -> list:
+        """
+        Returns the cells after source on the shortest path to a target
+        in the same cluster, staying within the cluster.
+        """
+        _, parents = self.local_search(source, self.cluster_of(source), [target], guided=True)
+        path = []
+        while target != source:
+            path.append(target)
+            target = parents[target]
+        path.reverse()
+        return path
+
+    def cells_changed(self, positions):
+        """
+        Accepts cell-change events: the (row, column) positions whose
+        walls were edited in the grid. Drops the cached clusters holding
+        them, and for cells on a cluster's edge, the border there and
+        the cluster on its other side, whose transitions may move.
+        """
+        size = self.cluster_size
+        for row, column in positions:
+            cluster = (row // size, column // size)
+            self.clusters.pop(cluster, None)
+            self.cluster_entrances.pop(cluster, None)
+            top, bottom, left, right = self.bounds(cluster)
+            for other in self.adjacent_clusters(cluster):
+                facing = (other[0] < cluster[0] and row == top) \
+                    or (other[0] > cluster[0] and row == bottom - 1) \
+                    or (other[1] < cluster[1] and column == left) \
+                    or (other[1] > cluster[1] and column == right - 1)
+                if facing:
+                    self.borders.pop((min(cluster, other), max(cluster, other)), None)
+                    self.clusters.pop(other, None)
+                    self.cluster_entrances.pop(other, None)
+
+    def set_barrier(self, position: tuple, blocked: bool = True):
+        """
+        Adds or removes a barrier in the grid and drops the
+        cached clusters it affects.
+        """
+        self.grid.set_state(self.grid.index(*position), BARRIER if blocked else EMPTY)
+        self.cells_changed([position])
+
+    def find_path(self, start: tuple, goal: tuple):
+        """
+        Finds a near-optimal path by searching the abstract graph of
+        transition cells, with the start and goal linked into their
+        clusters, then refining it into grid cells.
+
+        Returns:
+          a SearchResult whose expanded count is the number of abstract
+          graph nodes expanded, or None if there is no path
+        """
+        timer = time.perf_counter()
+        grid = self.grid
+        start_index = grid.index(*start)
+        goal_index = grid.index(*goal)
+        if grid.walls[start_index] or grid.walls[goal_index]:
+            return None
+
+        # Link the start and goal to the transition cells of their clusters,
+        # and to each other if they share one
+        start_cluster = self.cluster_of(start_index)
+        goal_cluster = self.cluster_of(goal_index)
+        targets = list(self.entrances(start_cluster))
+        if start_cluster == goal_cluster:
+            targets.append(goal_index)
+        start_edges, _ = self.local_search(start_index, start_cluster, targets)
+        goal_edges, _ = self.local_search(goal_index, goal_cluster, self.entrances(goal_cluster))
+
+        def edges(cell):
+            cluster = self.cluster_of(cell)
+            if cell == start_index:
+                yield from start_edges.items()
+            else:
+                yield from self.cluster_edges(cluster).get(cell, ())
+            yield from self.entrances(cluster).get(cell, ())
+            if cell in goal_edges:
+                yield goal_index, goal_edges[cell]
+
+        # A* over the abstract graph
+        count = 0
+        expanded = 0
+        scores = {start_index: 0}
+        parents = {start_index: -1}
+        frontier = [(self.heuristic(start, goal), count, start_index)]
+        while frontier:
+            estimate, _, current = heapq.heappop(frontier)
+            if current == goal_index:
+                break
+            if estimate > scores[current] + self.heuristic(grid.position(current), goal):
+                continue
+            expanded += 1
+            for neighbour, cost in edges(current):
+                if scores[current] + cost < scores.get(neighbour, INFINITY):
+                    scores[neighbour] = scores[current] + cost
+                    parents[neighbour] = current
+                    count += 1
+                    heapq.heappush(frontier, (scores[neighbour] + self.heuristic(grid.position(neighbour), goal),
+                                              count, neighbour))
+        else:
+            return None
+
+        abstract_path = []
+        current = goal_index
+        while current != -1:
+            abstract_path.append(current)
+            current = parents[current]
+        abstract_path.reverse()
+
+        # Refine each abstract edge: a step across a border, or a path
+        # within a cluster
+        path = [start_index]
+        for cell, following in zip(abstract_path, abstract_path[1:]):
+            if self.cluster_of(cell) == self.cluster_of(following):
+                path.extend(self.local_path(cell, following))
+            else:
+                path.append(following)
+
+        return SearchResult([grid.position(cell) for cell in path], scores[goal_index],
+                            expanded, time.perf_counter() - timer)
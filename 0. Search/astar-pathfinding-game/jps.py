@@ -0,0 +1,231 @@
+"""
+Jump Point Search over a Grid with octile movement.
+
+On uniform-cost grids many paths of equal length differ only in the
+order of their moves, and A* expands all of them. Jump Point Search
+prunes these symmetric paths: from each expanded cell it "jumps" in a
+straight line or diagonal until it reaches the goal or a cell with a
+forced neighbour, one that can only be reached optimally through that
+cell because of a barrier. Only those jump points enter the open set.
+
+The pruning rules here are the ones for movement that never cuts the
+corner of a barrier, matching grid.OCTILE, so paths have the same
+length as those found by astar.find_path.
+
+See https://harablog.wordpress.com/2011/09/07/jump-point-search/
+"""
+
+import heapq
+import time
+
+from astar import SearchResult, octile
+from grid import Grid, Movement, OCTILE
+
+# Directions searched from the start, which has no parent
+ALL_DIRECTIONS = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, -1), (-1, 1), (1, 1), (1, -1)]
+
+
+def sign(x):
+    return (x > 0) - (x < 0)
+
+
+def jump_point_search(grid: Grid, start: tuple, goal: tuple, on_step=None,
+                      movement: Movement = OCTILE):
+    """
+    Headless Jump Point Search over a grid, a drop-in for
+    astar.find_path on octile grids.
+
+    Args:
+      grid: the Grid to search, whose walls mark barriers
+      start: the (row, column) position to search from
+      goal: the (row, column) position to search to
+      on_step: optional callback on_step(event, index), called with
+        "open" when a jump point joins the frontier and "closed" when
+        it is expanded. Returning False from it aborts the search.
+      movement: must be OCTILE, the only model the pruning rules fit
+    Returns:
+      a SearchResult whose path lists every cell from start to goal,
+      and whose expanded count is the number of jump points expanded,
+      or None if there is no path or the search was aborted
+    """
+    if movement is not OCTILE:
+        raise ValueError(f"Jump Point Search needs octile movement, not {movement.name}")
+
+    timer = time.perf_counter()
+    generation = grid.new_search()
+    rows = grid.rows
+    columns = grid.columns
+    walls = grid.walls
+    walls_by_column = grid.walls_by_column()
+    g_score = grid.g_score
+    f_score = grid.f_score
+    parent = grid.parent
+    stamp = grid.stamp
+    goal_row, goal_column = goal
+    start_index = grid.index(*start)
+    goal_index = grid.index(*goal)
+
+    def walkable(row, column):
+        return 0 <= row < rows and 0 <= column < columns and not walls[row * columns + column]
+
+    def scan(line, base, length, sides, position, step, goal_position):
+        """
+        Scans one row (or column) of walls from position in direction
+        step, using bytes searches rather than a loop over cells.
+        sides holds the offsets of the neighbouring lines. Returns the
+        first position that is the goal or has a forced neighbour, a
+        cell beside the run that opens up just past a barrier, or None.
+        """
+        if step == 1:
+            end = line.find(1, base + position + 1, base + length)
+            end = length if end == -1 else end - base
+            stops = [goal_position] if goal_position is not None and position < goal_position < end else []
+            for side in sides:
+                forced = line.find(b"\x01\x00", side + position, side + end)
+                if forced != -1:
+                    stops.append(forced - side + 1)
+            return min(stops, default=None)
+
+        end = line.rfind(1, base, base + position)
+        end = -1 if end == -1 else end - base
+        stops = [goal_position] if goal_position is not None and end < goal_position < position else []
+        for side in sides:
+            forced = line.rfind(b"\x00\x01", side + end + 1, side + position + 1)
+            if forced != -1:
+                stops.append(forced - side)
+        return max(stops, default=None)
+
+    def jump_straight(row, column, d_row, d_column):
+        """
+        Moves in a straight line until the goal, a cell with a forced
+        neighbour, or a barrier. Returns the cell reached, or None.
+        """
+        if d_column:
+            base = row * columns
+            sides = [base + offset for offset, side_row in ((-columns, row - 1), (columns, row + 1))
+                     if 0 <= side_row < rows]
+            goal_position = goal_column if row == goal_row else None
+            stop = scan(walls, base, columns, sides, column, d_column, goal_position)
+            return None if stop is None else (row, stop)
+
+        base = column * rows
+        sides = [base + offset for offset, side_column in ((-rows, column - 1), (rows, column + 1))
+                 if 0 <= side_column < columns]
+        goal_position = goal_row if column == goal_column else None
+        stop = scan(walls_by_column, base, rows, sides, row, d_row, goal_position)
+        return None if stop is None else (stop, column)
+
+    def jump_diagonal(row, column, d_row, d_column):
+        """
+        Moves diagonally until the goal, a cell from which a straight
+        jump finds a jump point, or a blocked step. Returns the cell
+        reached, or None.
+        """
+        while True:
+            if not (walkable(row + d_row, column) and walkable(row, column + d_column)
+                    and walkable(row + d_row, column + d_column)):
+                return None
+            row += d_row
+            column += d_column
+            if row == goal_row and column == goal_column:
+                return row, column
+            if jump_straight(row, column, d_row, 0) is not None \
+                    or jump_straight(row, column, 0, d_column) is not None:
+                return row, column
+
+    def directions(index):
+        """
+        Directions worth jumping in from an expanded cell, given the
+        direction it was reached from.
+        """
+        if parent[index] == -1:
+            return ALL_DIRECTIONS
+        row, column = divmod(index, columns)
+        parent_row, parent_column = divmod(parent[index], columns)
+        d_row = sign(row - parent_row)
+        d_column = sign(column - parent_column)
+        if d_row and d_column:
+            return [(d_row, 0), (0, d_column), (d_row, d_column)]
+        if d_row:
+            return [(d_row, 0), (d_row, -1), (d_row, 1), (0, -1), (0, 1)]
+        return [(0, d_column), (-1, d_column), (1, d_column), (-1, 0), (1, 0)]
+
+    count = 0
+    expanded = 0
+    stamp[start_index] = generation
+    g_score[start_index] = 0
+    f_score[start_index] = octile(start, goal)
+    parent[start_index] = -1
+
+    # Open set as in astar.find_path: a heap of [f_score, count, index]
+    # entries, where decreasing a key marks the old entry removed
+    frontier = []
+    entries = {}
+    entry = [f_score[start_index], count, start_index]
+    entries[start_index] = entry
+    heapq.heappush(frontier, entry)
+
+    while frontier:
+        current = heapq.heappop(frontier)[2]
+        if current is None:
+            continue
+        del entries[current]
+        expanded += 1
+
+        if current == goal_index:
+            return SearchResult(fill_path(grid, current), g_score[goal_index],
+                                expanded, time.perf_counter() - timer)
+
+        row, column = divmod(current, columns)
+        for d_row, d_column in directions(current):
+            if d_row and d_column:
+                jump_point = jump_diagonal(row, column, d_row, d_column)
+            else:
+                jump_point = jump_straight(row, column, d_row, d_column)
+            if jump_point is None:
+                continue
+
+            neighbour = jump_point[0] * columns + jump_point[1]
+            temp_g_score = g_score[current] + octile((row, column), jump_point)
+            if stamp[neighbour] != generation or temp_g_score < g_score[neighbour]:
+                stamp[neighbour] = generation
+                parent[neighbour] = current
+                g_score[neighbour] = temp_g_score
+                f_score[neighbour] = temp_g_score + octile(jump_point, goal)
+
+                old_entry = entries.get(neighbour)
+                if old_entry is not None:
+                    old_entry[2] = None
+                count += 1
+                entry = [f_score[neighbour], count, neighbour]
+                entries[neighbour] = entry
+                heapq.heappush(frontier, entry)
+                if old_entry is None and on_step is not None and on_step("open", neighbour) is False:
+                    return None
+
+        if on_step is not None and current != start_index and on_step("closed", current) is False:
+            return None
+
+    return None
+
+
+def fill_path(grid: Grid, index: int) -> list:
+    """
+    Follows parents back from a cell through the jump points, filling
+    in the straight and diagonal runs between them, and returns the
+    (row, column) positions from start to that cell.
+    """
+    columns = grid.columns
+    path = [divmod(index, columns)]
+    while grid.parent[index] != -1:
+        row, column = divmod(index, columns)
+        index = grid.parent[index]
+        parent_row, parent_column = divmod(index, columns)
+        d_row = sign(parent_row - row)
+        d_column = sign(parent_column - column)
+        while (row, column) != (parent_row, parent_column):
+            row += d_row
+            column += d_column
+            path.append((row, column))
+    path.reverse()
+    return path
@@ -0,0 +1,166 @@
+"""
+Reading and writing grid maps and scenarios.
+
+Two map formats are supported:
+
+  MovingAI .map files, as used by the grid pathfinding benchmarks at
+  https://movingai.com/benchmarks/, with a short header and one
+  character per cell. '.', 'G' and 'S' are passable and '@', 'O',
+  'T' and 'W' are barriers.
+
+  Text maps, one line per row, with '.' for an empty cell, '#' for a
+  barrier and optionally one 'S' start and one 'G' goal.
+
+MovingAI .scen files list path queries on a map, one per line, with
+the optimal octile path length for each.
+"""
+
+from grid import Grid, BARRIER
+
+# MovingAI terrain characters that are passable
+PASSABLE = ".GS"
+
+# Text map characters
+TEXT_EMPTY = "."
+TEXT_BARRIER = "#"
+TEXT_START = "S"
+TEXT_GOAL = "G"
+
+
+class Scenario():
+    """
+    One path query from a MovingAI .scen file. Positions are
+    (row, column), where the file gives x (column) before y (row).
+    """
+    def __init__(self, bucket, map_name, width, height, start, goal, optimal):
+        self.bucket = bucket
+        self.map_name = map_name
+        self.width = width
+        self.height = height
+        self.start = start
+        self.goal = goal
+        self.optimal = optimal
+
+    def __repr__(self):
+        return f"Scenario({self.map_name!r}, {self.start}, {self.goal}, optimal={self.optimal})"
+
+
+def read_map(path) -> Grid:
+    """
+    Reads a MovingAI .map file into a Grid.
+    """
+    with open(path) as f:
+        header = {}
+        for line in f:
+            line = line.strip()
+            if line == "map":
+                break
+            if line:
+                key, value = line.split(maxsplit=1)
+                header[key] = value
+        else:
+            raise ValueError(f"{path} has no map section")
+
+        rows = int(header["height"])
+        columns = int(header["width"])
+        lines = [line.rstrip("\r\n") for line in f]
+
+    lines = [line for line in lines if line][:rows]
+    if len(lines) != rows or any(len(line) != columns for line in lines):
+        raise ValueError(f"{path} does not hold {rows} rows of {columns} cells")
+
+    # Barriers as 1 bytes, via a translation table over the characters
+    table = bytes(0 if chr(byte) in PASSABLE else 1 for byte in range(256))
+    walls = "".join(lines).encode("latin-1").translate(table)
+    return Grid.from_walls(walls, rows, columns)
+
+
+def write_map(grid: Grid, path):
+    """
+    Writes a Grid's barriers as a MovingAI .map file.
+    """
+    with open(path, "w") as f:
+        f.write(f"type octile\nheight {grid.rows}\nwidth {grid.columns}\nmap\n")
+        cells = bytes(grid.walls).translate(bytes.maketrans(b"\x00\x01", b".@"))
+        for row in range(grid.rows):
+            f.write(cells[row * grid.columns:(row + 1) * grid.columns].decode("ascii") + "\n")
+
+
+def read_scenarios(path) -> list:
+    """
+    Reads the path queries in a MovingAI .scen file.
+    """
+    scenarios = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0] == "version":
+                continue
+            bucket, map_name, width, height, start_x, start_y, goal_x, goal_y, optimal = fields[:9]
+            scenarios.append(Scenario(int(bucket), map_name, int(width), int(height),
+                                      (int(start_y), int(start_x)), (int(goal_y), int(goal_x)),
+                                      float(optimal)))
+    return scenarios
+
+
+def write_scenarios(scenarios, path):
+    """
+    Writes path queries as a MovingAI .scen file.
+    """
+    with open(path, "w") as f:
+        f.write("version 1\n")
+        for scenario in scenarios:
+            (start_row, start_column), (goal_row, goal_column) = scenario.start, scenario.goal
+            f.write(f"{scenario.bucket}\t{scenario.map_name}\t{scenario.width}\t{scenario.height}\t"
+                    f"{start_column}\t{start_row}\t{goal_column}\t{goal_row}\t{scenario.optimal:.8f}\n")
+
+
+def read_text(path) -> tuple:
+    """
+    Reads a text map. Returns (grid, start, goal), where start
+    and goal are (row, column) positions or None if not marked.
+    """
+    with open(path) as f:
+        lines = [line.rstrip("\r\n") for line in f if line.strip()]
+    if not lines:
+        raise ValueError(f"{path} is empty")
+
+    rows = len(lines)
+    columns = max(len(line) for line in lines)
+    grid = Grid(rows, columns)
+    start = goal = None
+    for row, line in enumerate(lines):
+        for column, cell in enumerate(line):
+            if cell == TEXT_BARRIER:
+                grid.set_state(grid.index(row, column), BARRIER)
+            elif cell == TEXT_START:
+                start = (row, column)
+            elif cell == TEXT_GOAL:
+                goal = (row, column)
+            elif cell != TEXT_EMPTY:
+                raise ValueError(f"Unknown cell {cell!r} at row {row + 1} of {path}")
+    return grid, start, goal
+
+
+def write_text(grid: Grid, path, start: tuple = None, goal: tuple = None):
+    """
+    Writes a Grid's barriers, and a start and goal if given, as a text map.
+    """
+    cells = bytearray(bytes(grid.walls).translate(bytes.maketrans(b"\x00\x01", b".#")))
+    if start is not None:
+        cells[grid.index(*start)] = ord(TEXT_START)
+    if goal is not None:
+        cells[grid.index(*goal)] = ord(TEXT_GOAL)
+    with open(path, "w") as f:
+        for row in range(grid.rows):
+            f.write(cells[row * grid.columns:(row + 1) * grid.columns].decode("ascii") + "\n")
+
+
+def load(path) -> tuple:
+    """
+    Reads a map in either format, by its extension. Returns
+    (grid, start, goal) as read_text does.
+    """
+    if str(path).endswith(".map"):
+        return read_map(path), None, None
+    return read_text(path)
@@ -0,0 +1,192 @@
+"""
+Headless scenario benchmark runner.
+
+Runs every query in MovingAI .scen files through a search on its map
+and reports nodes expanded, path cost against the optimal length
+recorded in the file, and latency percentiles, giving regression
+numbers for changes to the search. Exits with status 1 if an optimal
+search (astar or jps) misses a path or its optimal length.
+
+Benchmark maps and scenarios can be downloaded from
+https://movingai.com/benchmarks/grids.html, or made from any map with
+--make COUNT, which records path lengths found by Dijkstra's algorithm.
+
+Usage: python scenarios.py FILE.scen [FILE.scen ...] [--maps DIR]
+                           [--search astar|jps|hpa] [--cluster-size 32] [--json]
+       python scenarios.py FILE.map --make COUNT [--seed 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from astar import find_path, zero
+from hpa import CLUSTER_SIZE, HierarchicalGrid
+from jps import jump_point_search
+from maps import Scenario, read_map, read_scenarios, write_scenarios
+
+# Allowed difference from the optimal lengths in scenario files,
+# which are rounded and summed with a rounded sqrt(2)
+TOLERANCE = 1e-4
+
+# Lengths per scenario bucket, as in the MovingAI scenarios
+BUCKET_LENGTH = 4
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(values, percent):
+    """
+    Returns the nearest-rank percentile of a sorted list.
+    """
+    return values[min(len(values) - 1, max(0, -(-len(values) * percent // 100) - 1))]
+
+
+def map_path(scenario_path, map_name, maps_directory=None):
+    """
+    Finds the map a scenario refers to, looking in maps_directory
+    (by default the scenario file's own directory) under the name
+    in the file and then under its base name.
+    """
+    directory = maps_directory or os.path.dirname(scenario_path)
+    for candidate in [os.path.join(directory, map_name), os.path.join(directory, os.path.basename(map_name))]:
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"No map {map_name} for {scenario_path} in {directory or '.'}")
+
+
+def run_scenarios(path, search="astar", maps_directory=None, cluster_size=CLUSTER_SIZE):
+    """
+    Runs the scenarios in a .scen file and returns a summary dict of
+    their expansions, path costs and latencies in milliseconds.
+    """
+    grids = {}
+    hierarchies = {}
+    expansions = []
+    latencies = []
+    unsolved = 0
+    optimal = 0
+    excess = []
+    costs = 0
+    optimal_costs = 0
+
+    scenarios = read_scenarios(path)
+    for scenario in scenarios:
+        if scenario.map_name not in grids:
+            grids[scenario.map_name] = read_map(map_path(path, scenario.map_name, maps_directory))
+        grid = grids[scenario.map_name]
+
+        timer = time.perf_counter()
+        if search == "hpa":
+            if scenario.map_name not in hierarchies:
+                hierarchies[scenario.map_name] = HierarchicalGrid(grid, cluster_size)
+            result = hierarchies[scenario.map_name].find_path(scenario.start, scenario.goal)
+        elif search == "jps":
+            result = jump_point_search(grid, scenario.start, scenario.goal)
+        else:
+            result = find_path(grid, scenario.start, scenario.goal)
+        latencies.append((time.perf_counter() - timer) * 1000)
+
+        if result is None:
+            unsolved += 1
+            continue
+        expansions.append(result.expanded)
+        costs += result.cost
+        optimal_costs += scenario.optimal
+        if abs(result.cost - scenario.optimal) <= TOLERANCE * max(1, scenario.optimal):
+            optimal += 1
+        else:
+            excess.append(result.cost / scenario.optimal - 1 if scenario.optimal else float("inf"))
+
+    latencies.sort()
+    return {
+        "file": path,
+        "search": search,
+        "scenarios": len(scenarios),
+        "unsolved": unsolved,
+        "optimal": optimal,
+        "not_optimal": len(excess),
+        "worst_excess": max(excess, default=0),
+        "total_excess": costs / optimal_costs - 1 if optimal_costs else 0,
+        "mean_expanded": sum(expansions) / len(expansions) if expansions else 0,
+        "max_expanded": max(expansions, default=0),
+        "latency_ms": {
+            **{f"p{percent}": percentile(latencies, percent) for percent in PERCENTILES},
+            "max": latencies[-1],
+            "mean": sum(latencies) / len(latencies),
+        } if latencies else {},
+    }
+
+
+def print_summary(summary):
+    print(f"{summary['file']}: {summary['scenarios']:,} scenarios, {summary['search']}")
+    print(f"  solved       {summary['scenarios'] - summary['unsolved']:,}"
+          f" ({summary['unsolved']:,} without a path)")
+    print(f"  path cost    {summary['optimal']:,} optimal, {summary['not_optimal']:,} longer"
+          + (f" (worst {summary['worst_excess']:+.2%}, {summary['total_excess']:+.2%} in total)"
+             if summary["not_optimal"] else ""))
+    print(f"  expanded     {summary['mean_expanded']:,.0f} mean, {summary['max_expanded']:,} max")
+    if summary["latency_ms"]:
+        print("  latency ms   " + "  ".join(f"{name} {value:.3f}" for name, value in summary["latency_ms"].items()))
+
+
+def make_scenarios(grid, map_name, count, seed=0):
+    """
+    Returns count random scenarios between reachable open cells of a
+    grid, with their optimal octile lengths from Dijkstra's algorithm.
+    """
+    rng = random.Random(seed)
+    open_cells = [index for index in range(grid.size) if not grid.walls[index]]
+    if not open_cells:
+        raise ValueError(f"{map_name} has no open cells")
+
+    scenarios = []
+    attempts = 0
+    while len(scenarios) < count and attempts < count * 100:
+        attempts += 1
+        start = grid.position(rng.choice(open_cells))
+        goal = grid.position(rng.choice(open_cells))
+        result = find_path(grid, start, goal, heuristic=zero)
+        if result is None:
+            continue
+        scenarios.append(Scenario(int(result.cost // BUCKET_LENGTH), map_name, grid.columns, grid.rows,
+                                  start, goal, result.cost))
+    scenarios.sort(key=lambda scenario: scenario.optimal)
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MovingAI scenario files through a grid search.")
+    parser.add_argument("files", nargs="+", help=".scen files to run, or a .map file with --make")
+    parser.add_argument("--maps", help="directory holding the maps (default: next to each .scen file)")
+    parser.add_argument("--search", choices=["astar", "jps", "hpa"], default="astar")
+    parser.add_argument("--cluster-size", type=int, default=CLUSTER_SIZE, help="cluster width for --search hpa")
+    parser.add_argument("--json", action="store_true", help="print the summaries as JSON")
+    parser.add_argument("--make", type=int, metavar="COUNT",
+                        help="write COUNT random scenarios for each .map file to FILE.map.scen")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.make:
+        for path in args.files:
+            scenarios = make_scenarios(read_map(path), os.path.basename(path), args.make, args.seed)
+            write_scenarios(scenarios, f"{path}.scen")
+            print(f"Wrote {len(scenarios):,} scenarios to {path}.scen", file=sys.stderr)
+        return
+
+    summaries = [run_scenarios(path, args.search, args.maps, args.cluster_size) for path in args.files]
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        for summary in summaries:
+            print_summary(summary)
+
+    if args.search != "hpa" and any(summary["unsolved"] or summary["not_optimal"] for summary in summaries):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Compares memory use and latency of the original dict-of-sets
+data layout against the compact integer-indexed graph.
+
+Usage: python benchmark.py [directory] [queries]
+"""
+
+import csv
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import loader
+from graph import Graph
+
+
+def load_dict_layout(directory):
+    """
+    Loads the dataset into the original names/people/movies dicts.
+    """
+    names, people, movies = {}, {}, {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            people[row["id"]] = {"name": row["name"], "birth": row["birth"], "movies": set()}
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            movies[row["id"]] = {"title": row["title"], "year": row["year"], "stars": set()}
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+def load_graph_layout(directory):
+    """
+    Loads the dataset into a compact Graph.
+    """
+    graph = Graph()
+    loader.load_csv(graph, directory)
+    return graph
+
+
+def measure_load(load, directory):
+    """
+    Returns (result, seconds, retained bytes, peak bytes) for a loader.
+    """
+    gc.collect()
+    tracemalloc.start()
+    timer = time.perf_counter()
+    result = load(directory)
+    seconds = time.perf_counter() - timer
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, retained, peak
+
+
+def bfs_dict(people, movies, source, target):
+    """
+    Breadth-first search over the dict layout, returning the distance.
+    """
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        person = queue.popleft()
+        for movie in people[person]["movies"]:
+            for star in movies[movie]["stars"]:
+                if star not in distance:
+                    distance[star] = distance[person] + 1
+                    if star == target:
+                        return distance[star]
+                    queue.append(star)
+    return distance.get(target)
+
+
+def bfs_graph(graph, source, target):
+    """
+    Breadth-first search over the compact graph, returning the distance.
+    """
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        person = queue.popleft()
+        for _, star in graph.neighbors(person):
+            if star not in distance:
+                distance[star] = distance[person] + 1
+                if star == target:
+                    return distance[star]
+                queue.append(star)
+    return distance.get(target)
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    (names, people, movies), dict_seconds, dict_retained, dict_peak = \
+        measure_load(load_dict_layout, directory)
+    graph, graph_seconds, graph_retained, graph_peak = \
+        measure_load(load_graph_layout, directory)
+
+    print(f"{'layout':<8}{'load (s)':>12}{'retained (MB)':>16}{'peak (MB)':>12}")
+    print(f"{'dict':<8}{dict_seconds:>12.3f}{dict_retained / 2**20:>16.1f}{dict_peak / 2**20:>12.1f}")
+    print(f"{'graph':<8}{graph_seconds:>12.3f}{graph_retained / 2**20:>16.1f}{graph_peak / 2**20:>12.1f}")
+
+    rng = random.Random(0)
+    pairs = [tuple(rng.sample(graph.person_ids, 2)) for _ in range(queries)]
+
+    timer = time.perf_counter()
+    for source, target in pairs:
+        bfs_dict(people, movies, source, target)
+    dict_query = (time.perf_counter() - timer) / queries
+
+    timer = time.perf_counter()
+    for source, target in pairs:
+        bfs_graph(graph, graph.person_index[source], graph.person_index[target])
+    graph_query = (time.perf_counter() - timer) / queries
+
+    print(f"Mean query latency over {queries} random pairs: "
+          f"dict {dict_query * 1000:.3f} ms, graph {graph_query * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,104 @@
-import csv
+import argparse
+import heapq
+import json
 import sys
 import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
+import loader
+import snapshot
+from graph import Graph, NeighborCache
 from util import Node, StackFrontier, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Compact integer-indexed graph of people and movies
+graph = Graph()
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Optional LRU cache of flat neighbor tuples, see enable_neighbor_cache
+neighbor_cache = None
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
 
-
-def load_data(directory):
+def load_data(directory, filters=None, **options):
     """
-    Load data from CSV files into memory.
+    Load data into memory. Maps in a binary snapshot of the CSV files
+    if an up-to-date one exists, otherwise parses the CSV files and
+    writes a fresh snapshot for next time.
+
+    filters is a dict of loader.load_csv movie filters (min_year,
+    max_year, min_cast), and options are its other keyword arguments.
+    Each call loads into a fresh Graph, which replaces the current one
+    only once it has loaded.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    global graph
+    filters = loader.active_filters(filters)
+    loaded = Graph()
+    path = snapshot.snapshot_path(directory)
+    if snapshot.is_fresh(path, directory, filters):
+        snapshot.load_snapshot(loaded, path)
+    else:
+        sources = snapshot.source_mtimes(directory)
+        loader.load_csv(loaded, directory, **filters, **options)
+        try:
+            snapshot.write_snapshot(loaded, path, sources, filters)
+        except OSError:
+            pass
 
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    graph = loaded
+    if neighbor_cache is not None:
+        neighbor_cache.graph = graph
+        neighbor_cache.clear()
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Degrees of separation between two actors.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both actors at once")
+    parser.add_argument("--landmarks", type=int, metavar="K",
+                        help="guide an A* search with a precomputed index of K landmark actors")
+    parser.add_argument("--neighbor-cache", type=int, metavar="N",
+                        help="cache the neighbors of the N most recently expanded people")
+    loader.add_filter_arguments(parser)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", metavar="FILE",
+                      help="answer tab-separated source/target pairs from FILE ('-' for stdin) as JSON lines")
+    mode.add_argument("--serve", metavar="PORT", type=int,
+                      help="answer queries over HTTP on localhost:PORT, e.g. /path?source=...&target=...")
+    args = parser.parse_args()
+
+    # Keep stdout clean for JSON results in the non-interactive modes
+    status = sys.stderr if args.batch or args.serve else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=status)
+    filters = loader.filters_from_args(args)
+    load_data(args.directory, filters,
+              max_memory=args.max_memory * 2**20 if args.max_memory else None,
+              progress=loader.print_progress(status) if args.progress else None)
+    print("Data loaded.", file=status)
+
+    if args.neighbor_cache:
+        enable_neighbor_cache(args.neighbor_cache)
+
+    landmarks = None
+    if args.landmarks:
+        from landmarks import load_landmarks
+        landmarks = load_landmarks(args.directory, graph, args.landmarks, filters)
+
+    if args.batch:
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, args.bidirectional, landmarks)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, args.bidirectional, landmarks)
+        if neighbor_cache is not None:
+            print(f"Neighbor cache: {neighbor_cache.stats()}", file=status)
+        return
+
+    if args.serve:
+        print(f"Serving on http://localhost:{args.serve}/path", file=status)
+        serve(args.serve, args.bidirectional, landmarks)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -70,7 +107,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, args.bidirectional, landmarks)
 
     if path is None:
         print("Not connected.")
@@ -79,13 +116,13 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[graph.person_index[path[i][1]]]
+            person2 = graph.person_names[graph.person_index[path[i + 1][1]]]
+            movie = graph.movie_titles[graph.movie_index[path[i + 1][0]]]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, landmarks=None):
     """
     Finds the shortest path between any two actors (source, target)
     by choosing a sequence of movies that connects them. 
@@ -93,12 +130,57 @@ def shortest_path(source, target):
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If bidirectional is True, searches from both ends at once,
+    always expanding the smaller of the two frontiers.
+
+    If a landmark index is given, runs an A* search guided by
+    the landmark distance lower bounds instead.
+
     If no possible path, returns None.
     """
+    source_name = graph.person_names[graph.person_index[source]]
+    target_name = graph.person_names[graph.person_index[target]]
     print(
-        f"Finding shortest path between {people[source]['name']} ({source}) and {people[target]['name']} ({target})...")
+        f"Finding shortest path between {source_name} ({source}) and {target_name} ({target})...")
     timer = time.time()
 
+    path, number_of_states_explored = find_path(source, target, bidirectional, landmarks)
+
+    seconds_taken = time.time() - timer
+    print(f"Explored { number_of_states_explored } states in { seconds_taken } seconds")
+
+    return path
+
+
+def find_path(source, target, bidirectional=False, landmarks=None):
+    """
+    Finds the shortest path between two actors like shortest_path,
+    but silently. Returns a tuple of the path, or None if no path
+    exists, and the number of states explored.
+    """
+    # Search runs on dense integer indexes rather than IMDB ids
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if landmarks is not None:
+        path, number_of_states_explored = landmark_search(source, target, landmarks)
+    elif bidirectional:
+        path, number_of_states_explored = bidirectional_search(source, target)
+    else:
+        path, number_of_states_explored = breadth_first_search(source, target)
+
+    if path is None:
+        return None, number_of_states_explored
+    path = [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+    return path, number_of_states_explored
+
+
+def breadth_first_search(source, target):
+    """
+    Breadth-first search between two person indexes.
+
+    Returns a tuple of the (movie, person) index path, or None
+    if no path exists, and the number of states explored.
+    """
     # Start with frontier and initial node
     frontier = QueueFrontier()
     initial_node = Node(state=source, parent=None, action=None)
@@ -112,7 +194,7 @@ def shortest_path(source, target):
 
         # If frontier is empty no solution
         if frontier.empty():
-            return None
+            return None, number_of_states_explored
 
         # Remove a node from the frontier
         node = frontier.remove()
@@ -123,7 +205,8 @@ def shortest_path(source, target):
 
         # Expand node, add resulting nodes to the frontier if the aren't already
         # in the frontier or the explored set
-        for movie_id, person_id in neighbors_for_person(node.state):
+        neighbors = iter(neighbors_of(node.state))
+        for movie_id, person_id in zip(neighbors, neighbors):
             if not frontier.contains_state(person_id) and person_id not in explored:
                 child = Node(state=person_id, parent=node, action=movie_id)
 
@@ -138,28 +221,146 @@ def shortest_path(source, target):
                         node = node.parent
                     path.reverse()
 
-                    seconds_taken = time.time() - timer
-                    print(f"Explored { number_of_states_explored } states in { seconds_taken } seconds")
-                    
-                    return path
+                    return path, number_of_states_explored
 
                 frontier.add(child)
 
 
+def bidirectional_search(source, target):
+    """
+    Bidirectional breadth-first search between two person indexes.
+
+    Expands a whole layer of whichever side has the smaller frontier.
+    The first person reached by both sides lies on a shortest path,
+    since any shorter path would have met on an earlier layer.
+
+    Returns a tuple of the (movie, person) index path, or None
+    if no path exists, and the number of states explored.
+    """
+    # Match breadth_first_search, which never treats a person as their own neighbor
+    if source == target:
+        return None, 0
+
+    # Each side maps a reached person to the (movie, person) step back towards its root
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    number_of_states_explored = 0
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, others = forward_frontier, forward, backward
+        else:
+            frontier, parents, others = backward_frontier, backward, forward
+
+        next_frontier = []
+        for person in frontier:
+            number_of_states_explored += 1
+            neighbors = iter(neighbors_of(person))
+            for movie, neighbor in zip(neighbors, neighbors):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie, person)
+                if neighbor in others:
+                    return join_paths(neighbor, forward, backward), number_of_states_explored
+                next_frontier.append(neighbor)
+
+        if parents is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None, number_of_states_explored
+
+
+def landmark_search(source, target, landmarks):
+    """
+    A* search between two person indexes, using the landmark
+    distance lower bound to the target as its heuristic.
+
+    Returns a tuple of the (movie, person) index path, or None
+    if no path exists, and the number of states explored.
+    """
+    # Match breadth_first_search, which never treats a person as their own neighbor
+    if source == target:
+        return None, 0
+
+    # Landmarks that reach only one of the two prove there is no path
+    lower, _ = landmarks.bounds(source, target)
+    if lower is None:
+        return None, 0
+
+    h = landmarks.heuristic(target)
+    g_score = {source: 0}
+    parents = {source: None}
+    explored = set()
+    number_of_states_explored = 0
+
+    # Ties on f are broken towards deeper nodes, which are closer to the target
+    frontier = [(h(source), 0, source)]
+    while frontier:
+        _, negative_g, person = heapq.heappop(frontier)
+        if person in explored:
+            continue
+        if person == target:
+            path = []
+            while parents[person] is not None:
+                movie, parent = parents[person]
+                path.append((movie, person))
+                person = parent
+            path.reverse()
+            return path, number_of_states_explored
+
+        explored.add(person)
+        number_of_states_explored += 1
+        g = -negative_g + 1
+        neighbors = iter(neighbors_of(person))
+        for movie, neighbor in zip(neighbors, neighbors):
+            if neighbor not in explored and g < g_score.get(neighbor, g + 1):
+                g_score[neighbor] = g
+                parents[neighbor] = (movie, person)
+                heapq.heappush(frontier, (g + h(neighbor), -g, neighbor))
+
+    return None, number_of_states_explored
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Joins the forward and backward search trees at the meeting
+    person into a single list of (movie, person) index pairs.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, parent = backward[person]
+        path.append((movie, parent))
+        person = parent
+
+    return path
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [graph.person_ids[i] for i in graph.people_named(name)]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            person = graph.person_index[person_id]
+            name = graph.person_names[person]
+            birth = graph.person_births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -172,17 +373,189 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_query(query):
+    """
+    Returns the IMDB ids matching a query, which is
+    either an IMDB id or a person's name.
+    """
+    if query in graph.person_index:
+        return [query]
+    return [graph.person_ids[i] for i in graph.people_named(query)]
+
+
+def answer_query(source_query, target_query, bidirectional=False, landmarks=None):
+    """
+    Answers a source/target query without prompting, returning a
+    JSON-serializable dict. Ambiguous names are reported as an error
+    listing the candidate IMDB ids rather than resolved interactively.
+    """
+    answer = {"source": source_query, "target": target_query}
+    people = []
+    for query in (source_query, target_query):
+        person_ids = person_ids_for_query(query)
+        if len(person_ids) == 0:
+            answer["error"] = f"Person not found: {query}"
+            return answer
+        if len(person_ids) > 1:
+            answer["error"] = f"Ambiguous name: {query}"
+            answer["candidates"] = [
+                {"person_id": person_id, "birth": graph.person_births[graph.person_index[person_id]]}
+                for person_id in person_ids
+            ]
+            return answer
+        people.append(person_ids[0])
+
+    timer = time.time()
+    path, number_of_states_explored = find_path(*people, bidirectional, landmarks)
+    answer["explored"] = number_of_states_explored
+    answer["seconds"] = time.time() - timer
+
+    if path is None:
+        answer["degrees"] = None
+        answer["path"] = None
+    else:
+        answer["degrees"] = len(path)
+        answer["path"] = [
+            {
+                "movie_id": movie_id,
+                "title": graph.movie_titles[graph.movie_index[movie_id]],
+                "person_id": person_id,
+                "name": graph.person_names[graph.person_index[person_id]],
+            }
+            for movie_id, person_id in path
+        ]
+    return answer
+
+
+def complete_name(query, k=10, max_distance=None):
+    """
+    Returns up to k people for a partial name as JSON-serializable
+    dicts, ranked by movie count. Matches names starting with query,
+    or, if max_distance is given, names within that many edits of it.
+    """
+    if max_distance is None:
+        people = graph.people_with_prefix(query, k)
+    else:
+        people = graph.people_like(query, max_distance, k)
+    return [
+        {
+            "person_id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": graph.movie_count(person),
+        }
+        for person in people
+    ]
+
+
+def run_batch(lines, output, bidirectional=False, landmarks=None):
+    """
+    Answers one tab-separated source/target pair per input line,
+    writing each answer to output as a JSON line as soon as it is found.
+    """
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            answer = {"line": line, "error": "Expected source and target separated by a tab"}
+        else:
+            answer = answer_query(fields[0].strip(), fields[1].strip(), bidirectional, landmarks)
+        output.write(json.dumps(answer) + "\n")
+        output.flush()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET /path?source=...&target=... with a JSON answer, and
+    GET /complete?q=...[&k=10][&fuzzy=N] with name suggestions,
+    and GET /stats with the neighbor cache counters.
+    """
+    bidirectional = False
+    landmarks = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/complete":
+            self.complete(query)
+        elif url.path == "/stats":
+            self.send_json(200, {"neighbor_cache": neighbor_cache.stats() if neighbor_cache else None})
+        elif url.path != "/path":
+            self.send_json(404, {"error": "Not found"})
+        elif "source" not in query or "target" not in query:
+            self.send_json(400, {"error": "Expected source and target parameters"})
+        else:
+            bidirectional = query.get("bidirectional", [str(int(self.bidirectional))])[0] == "1"
+            self.send_json(200, answer_query(query["source"][0], query["target"][0], bidirectional, self.landmarks))
+
+    def complete(self, query):
+        if "q" not in query:
+            self.send_json(400, {"error": "Expected q parameter"})
+            return
+        try:
+            k = int(query.get("k", ["10"])[0])
+            max_distance = int(query["fuzzy"][0]) if "fuzzy" in query else None
+        except ValueError:
+            self.send_json(400, {"error": "Expected integer k and fuzzy parameters"})
+            return
+        self.send_json(200, complete_name(query["q"][0], k, max_distance))
+
+    def send_json(self, status, body):
+        body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port, bidirectional=False, landmarks=None):
+    """
+    Serves queries over HTTP on localhost until interrupted,
+    keeping the loaded graph resident between requests.
+    """
+    QueryHandler.bidirectional = bidirectional
+    QueryHandler.landmarks = landmarks
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def enable_neighbor_cache(maxsize=4096):
+    """
+    Caches the neighbors of the maxsize most recently expanded
+    people, returning the cache so its hit/miss counters can be read.
+    A maxsize of 0 disables the cache.
+    """
+    global neighbor_cache
+    neighbor_cache = NeighborCache(graph, maxsize) if maxsize else None
+    return neighbor_cache
+
+
+def neighbors_of(person):
+    """
+    Returns the neighbors of a person index as a flat
+    (movie, person, movie, person, ...) tuple of indexes,
+    through the neighbor cache if it is enabled.
+    """
+    if neighbor_cache is not None:
+        return neighbor_cache.get(person)
+    return graph.flat_neighbors(person)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    neighbors = iter(neighbors_of(graph.person_index[person_id]))
+    return {(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in zip(neighbors, neighbors)}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,343 @@
+"""
+Compact integer-indexed graph of people and the movies they starred in.
+
+IMDB id strings are interned to dense integer indexes, and adjacency is
+stored CSR-style in flat `array`s: the movies of person i are
+person_movies[person_offsets[i]:person_offsets[i + 1]], and the stars of
+movie j are movie_stars[movie_offsets[j]:movie_offsets[j + 1]].
+"""
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+# Typecode used for every index and offset array
+INDEX_TYPE = "l"
+
+
+class Graph():
+    def __init__(self):
+        # Maps IMDB ids to dense integer indexes, and indexes back to IMDB ids
+        self.person_ids = []
+        self.person_index = {}
+        self.movie_ids = []
+        self.movie_index = {}
+
+        # Person and movie attributes, indexed by dense integer
+        self.person_names = []
+        self.person_births = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # Person indexes sorted by lowercase name, and a max segment tree
+        # over positions in that order keyed by each person's movie count
+        self.name_order = array(INDEX_TYPE)
+        self.name_tree = array(INDEX_TYPE)
+
+        # CSR adjacency in both directions
+        self.person_offsets = array(INDEX_TYPE, [0])
+        self.person_movies = array(INDEX_TYPE)
+        self.movie_offsets = array(INDEX_TYPE, [0])
+        self.movie_stars = array(INDEX_TYPE)
+
+        # Memory map backing the arrays when loaded from a snapshot
+        self.mmap = None
+
+    def add_person(self, person_id, name, birth):
+        """
+        Interns a person and returns their dense index.
+        """
+        index = self.person_index.get(person_id)
+        if index is not None:
+            return index
+        index = len(self.person_ids)
+        self.person_index[person_id] = index
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Interns a movie and returns its dense index.
+        """
+        index = self.movie_index.get(movie_id)
+        if index is not None:
+            return index
+        index = len(self.movie_ids)
+        self.movie_index[movie_id] = index
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        return index
+
+    def build_adjacency(self, edge_people, edge_movies):
+        """
+        Builds both CSR adjacency directions from parallel arrays
+        of (person, movie) edges, dropping duplicate edges.
+        """
+        offsets, values = csr(len(self.person_ids), edge_people, edge_movies)
+
+        # Deduplicate each person's movie list in place
+        self.person_offsets = array(INDEX_TYPE, [0])
+        self.person_movies = array(INDEX_TYPE)
+        for i in range(len(self.person_ids)):
+            row = values[offsets[i]:offsets[i + 1]]
+            self.person_movies.extend(sorted(set(row)))
+            self.person_offsets.append(len(self.person_movies))
+
+        # Transpose the deduplicated edges into movie -> stars
+        sources = array(INDEX_TYPE)
+        for i in range(len(self.person_ids)):
+            sources.extend([i] * (self.person_offsets[i + 1] - self.person_offsets[i]))
+        self.movie_offsets, self.movie_stars = csr(
+            len(self.movie_ids), self.person_movies, sources)
+
+    def build_name_index(self):
+        """
+        Sorts person indexes by lowercase name for binary search, and
+        builds a segment tree over that order to find the people with
+        the most movies in any range of names.
+        """
+        names = self.person_names
+        self.name_order = array(
+            INDEX_TYPE, sorted(range(len(names)), key=lambda i: names[i].lower()))
+
+        # name_tree[size + i] is position i, and each internal node holds
+        # whichever of its two children's positions has more movies
+        size = len(self.name_order)
+        self.name_tree = array(INDEX_TYPE, [0]) * size + array(INDEX_TYPE, range(size))
+        for node in range(size - 1, 0, -1):
+            left, right = self.name_tree[2 * node], self.name_tree[2 * node + 1]
+            if self.movie_count(self.name_order[right]) > self.movie_count(self.name_order[left]):
+                left = right
+            self.name_tree[node] = left
+
+    def people_named(self, name):
+        """
+        Returns the person indexes with a given name, ignoring case.
+        """
+        names = self.person_names
+        name = name.lower()
+        start = bisect_left(self.name_order, name, key=lambda i: names[i].lower())
+        end = bisect_right(self.name_order, name, lo=start, key=lambda i: names[i].lower())
+        return list(self.name_order[start:end])
+
+    def people_with_prefix(self, prefix, k=10):
+        """
+        Returns up to k person indexes whose names start with prefix,
+        ignoring case, ordered by most movies first.
+        """
+        names = self.person_names
+        prefix = prefix.lower()
+        start = bisect_left(self.name_order, prefix, key=lambda i: names[i].lower())
+        end = bisect_left(self.name_order, prefix + "\U0010ffff", lo=start,
+                          key=lambda i: names[i].lower())
+        return self.most_movies(start, end, k)
+
+    def most_movies(self, start, end, k):
+        """
+        Returns up to k person indexes from name_order[start:end]
+        with the most movies, in descending order of movie count.
+        """
+        tree = self.name_tree
+        order = self.name_order
+        size = len(order)
+
+        # Seed a max-heap with the segment tree nodes covering the range
+        heap = []
+        low, high = start + size, end + size
+        while low < high:
+            if low & 1:
+                heap.append((-self.movie_count(order[tree[low]]), low))
+                low += 1
+            if high & 1:
+                high -= 1
+                heap.append((-self.movie_count(order[tree[high]]), high))
+            low >>= 1
+            high >>= 1
+        heapq.heapify(heap)
+
+        # Pop the best node, splitting internal nodes into their children
+        people = []
+        while heap and len(people) < k:
+            _, node = heapq.heappop(heap)
+            if node >= size:
+                people.append(order[node - size])
+                continue
+            for child in (2 * node, 2 * node + 1):
+                heapq.heappush(heap, (-self.movie_count(order[tree[child]]), child))
+        return people
+
+    def people_like(self, name, max_distance=2, k=10):
+        """
+        Returns up to k person indexes whose names are within
+        max_distance edits of name, ignoring case, ordered by fewest
+        edits and then most movies.
+
+        Walks the sorted names as an implicit trie: the edit distance
+        rows for a shared prefix are reused between neighbouring names,
+        and every name under a prefix that is already more than
+        max_distance edits away is skipped with a single binary search.
+        """
+        names = self.person_names
+        order = self.name_order
+        query = name.lower()
+
+        def key(i):
+            return names[i].lower()
+
+        rows = [list(range(len(query) + 1))]
+        previous = ""
+        matches = []
+        position = 0
+        while position < len(order):
+            current = key(order[position])
+
+            # Keep the rows for the prefix shared with the previous name
+            common = 0
+            limit = min(len(current), len(previous))
+            while common < limit and current[common] == previous[common]:
+                common += 1
+            del rows[common + 1:]
+
+            pruned = False
+            for depth in range(common, len(current)):
+                above = rows[-1]
+                row = [above[0] + 1]
+                for j, character in enumerate(query):
+                    row.append(min(row[j] + 1, above[j + 1] + 1,
+                                   above[j] + (character != current[depth])))
+                rows.append(row)
+                if min(row) > max_distance:
+                    pruned = True
+                    break
+
+            if pruned:
+                previous = current[:len(rows) - 1]
+                position = bisect_left(order, previous + "\U0010ffff", lo=position + 1, key=key)
+                continue
+
+            if rows[-1][-1] <= max_distance:
+                person = order[position]
+                matches.append((rows[-1][-1], -self.movie_count(person), person))
+            previous = current
+            position += 1
+
+        return [person for _, _, person in heapq.nsmallest(k, matches)]
+
+    def movie_count(self, person):
+        """
+        Returns the number of movies a person index starred in.
+        """
+        return self.person_offsets[person + 1] - self.person_offsets[person]
+
+    def movies_of(self, person):
+        """
+        Returns the movie indexes a person index starred in.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indexes that starred in a movie index.
+        """
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people
+        who starred with a given person index.
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for movie in self.movies_of(person):
+            for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                yield movie, star
+
+    def flat_neighbors(self, person):
+        """
+        Returns the neighbors of a person index as one flat tuple
+        (movie, person, movie, person, ...), which costs a single
+        allocation instead of one tuple per pair.
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        flat = []
+        for movie in self.movies_of(person):
+            stars = movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]
+            pairs = [movie] * (2 * len(stars))
+            pairs[1::2] = stars
+            flat.extend(pairs)
+        return tuple(flat)
+
+
+class NeighborCache():
+    """
+    Bounded least-recently-used cache of flat neighbor tuples keyed by
+    person index, so hub actors expanded by many queries are only
+    flattened once. Safe to share between server threads.
+    """
+    def __init__(self, graph, maxsize=4096):
+        self.graph = graph
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, person):
+        """
+        Returns the flat neighbor tuple of a person index.
+        """
+        with self.lock:
+            neighbors = self.entries.get(person)
+            if neighbors is not None:
+                self.entries.move_to_end(person)
+                self.hits += 1
+                return neighbors
+            self.misses += 1
+
+        neighbors = self.graph.flat_neighbors(person)
+        with self.lock:
+            self.entries[person] = neighbors
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return neighbors
+
+    def stats(self):
+        """
+        Returns the cache's size and hit/miss counters as a dict.
+        """
+        with self.lock:
+            return {"size": len(self.entries), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def csr(count, sources, targets):
+    """
+    Counting-sorts parallel (source, target) arrays into CSR form.
+    Returns (offsets, values) where the targets of source i are
+    values[offsets[i]:offsets[i + 1]].
+    """
+    offsets = array(INDEX_TYPE, [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array(INDEX_TYPE, offsets)
+    values = array(INDEX_TYPE, [0]) * len(sources)
+    for source, target in zip(sources, targets):
+        values[cursor[source]] = target
+        cursor[source] += 1
+
+    return offsets, values
@@ -0,0 +1,235 @@
+"""
+Landmark (ALT) distance index for fast degree-of-separation estimates.
+
+Breadth-first distances from k well-connected landmark actors are
+precomputed and stored on disk. By the triangle inequality, for every
+landmark L the distance between s and t is at least |d(L, s) - d(L, t)|
+and at most d(L, s) + d(L, t), which bounds any query with k lookups
+and gives A* an admissible, consistent heuristic.
+
+Usage: python landmarks.py [directory] [--landmarks K] [--bounds SOURCE TARGET]
+                           [--min-year YEAR] [--max-year YEAR] [--min-cast N]
+                           [--max-memory MB] [--progress]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import degrees
+import loader
+import snapshot
+from separation import bfs_distances
+
+LANDMARKS_NAME = "landmarks.index"
+MAGIC = b"LANDMRK\x02"
+
+# Distance byte marking people a landmark cannot reach
+UNREACHABLE = 255
+
+# Distances are capped here, so a stored value of CAPPED means "at least CAPPED"
+CAPPED = UNREACHABLE - 1
+
+
+class LandmarkIndex():
+    """
+    Memory-mapped table of distances from each landmark,
+    where distances[l * people + p] is the distance from
+    landmark l to person index p.
+    """
+    def __init__(self, landmarks, people, distances, sources=None, filters=None):
+        self.landmarks = landmarks
+        self.people = people
+        self.distances = distances
+        self.sources = sources
+        self.filters = filters or {}
+        self.mmap = None
+
+    def distances_to(self, person):
+        """
+        Returns the distance from each landmark to a person index.
+        """
+        distances = self.distances
+        people = self.people
+        return [distances[l * people + person] for l in range(len(self.landmarks))]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the distance between two
+        person indexes. upper is None when no landmark reaches both.
+        Returns (None, None) if they are certainly not connected.
+        """
+        if source == target:
+            return 0, 0
+        lower, upper = 0, None
+        for a, b in zip(self.distances_to(source), self.distances_to(target)):
+            if (a == UNREACHABLE) != (b == UNREACHABLE):
+                return None, None
+            if a == UNREACHABLE:
+                continue
+            lower = max(lower, abs(a - b))
+            if a < CAPPED and b < CAPPED and (upper is None or a + b < upper):
+                upper = a + b
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Returns a function estimating the distance from a person index
+        to target, which never overestimates it.
+        """
+        distances = self.distances
+        people = self.people
+        targets = [(l * people, d) for l, d in enumerate(self.distances_to(target)) if d != UNREACHABLE]
+
+        def h(person):
+            estimate = 0
+            for offset, d in targets:
+                estimate = max(estimate, abs(distances[offset + person] - d))
+            return estimate
+
+        return h
+
+
+def landmarks_path(directory, filters=None):
+    """
+    Returns the index file for a directory, with the loader filters in
+    its name, so indexes for different filters are kept side by side.
+    """
+    if not filters:
+        return os.path.join(directory, LANDMARKS_NAME)
+    name, extension = os.path.splitext(LANDMARKS_NAME)
+    suffix = "".join(f"-{key}={value}" for key, value in sorted(filters.items()))
+    return os.path.join(directory, f"{name}{suffix}{extension}")
+
+
+def choose_landmarks(graph, k):
+    """
+    Returns the k person indexes who starred in the most movies.
+    """
+    offsets = graph.person_offsets
+    count = len(offsets) - 1
+    return sorted(range(count), key=lambda p: offsets[p + 1] - offsets[p], reverse=True)[:k]
+
+
+def build_index(graph, k, sources=None, filters=None):
+    """
+    Runs a breadth-first search from each of k landmarks.
+    """
+    landmarks = choose_landmarks(graph, k)
+    distances = bytearray()
+    for landmark in landmarks:
+        distances += bfs_distances(graph, landmark, UNREACHABLE)
+    return LandmarkIndex(landmarks, len(graph.person_offsets) - 1, distances, sources, filters)
+
+
+def write_index(index, path):
+    """
+    Writes a landmark index to disk.
+    """
+    header = json.dumps({
+        "landmarks": index.landmarks,
+        "people": index.people,
+        "sources": index.sources,
+        "filters": index.filters,
+    }).encode("utf-8")
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(index.distances)
+    os.replace(temporary, path)
+
+
+def read_index(path):
+    """
+    Memory-maps a landmark index from disk, returning None
+    if the file is missing or not a landmark index.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    start = len(MAGIC) + 8 + length
+    index = LandmarkIndex(header["landmarks"], header["people"],
+                          memoryview(mapped)[start:], header["sources"], header["filters"])
+    index.mmap = mapped
+    return index
+
+
+def load_landmarks(directory, graph, k=16, filters=None):
+    """
+    Loads the landmark index for a directory and the loader filters the
+    graph was loaded with, rebuilding it with k landmarks if it is
+    missing, stale, or has a different k. An index built from another
+    filtered graph would overestimate distances in this one.
+    """
+    filters = loader.active_filters(filters)
+    path = landmarks_path(directory, filters)
+    sources = snapshot.source_mtimes(directory)
+    index = read_index(path)
+    if index is not None and index.sources == sources \
+            and index.filters == filters \
+            and index.people == len(graph.person_offsets) - 1 \
+            and len(index.landmarks) == k:
+        return index
+
+    index = build_index(graph, k, sources, filters)
+    try:
+        write_index(index, path)
+    except OSError:
+        pass
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Landmark distance index for degrees.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--landmarks", type=int, default=16, metavar="K")
+    parser.add_argument("--bounds", nargs=2, metavar=("SOURCE", "TARGET"),
+                        help="print distance bounds between two names or IMDB ids")
+    loader.add_filter_arguments(parser)
+    args = parser.parse_args()
+
+    filters = loader.filters_from_args(args)
+    degrees.load_data(args.directory, filters,
+                      max_memory=args.max_memory * 2**20 if args.max_memory else None,
+                      progress=loader.print_progress(sys.stdout) if args.progress else None)
+    graph = degrees.graph
+
+    timer = time.time()
+    index = load_landmarks(args.directory, graph, args.landmarks, filters)
+    print(f"Landmark index with {len(index.landmarks)} landmarks ready in {time.time() - timer} seconds")
+
+    if args.bounds:
+        people = []
+        for query in args.bounds:
+            person_ids = degrees.person_ids_for_query(query)
+            if len(person_ids) != 1:
+                sys.exit(f"Expected exactly one person for '{query}', found {len(person_ids)}")
+            people.append(graph.person_index[person_ids[0]])
+
+        timer = time.perf_counter()
+        lower, upper = index.bounds(*people)
+        microseconds = (time.perf_counter() - timer) * 1e6
+        if lower is None:
+            print(f"Not connected ({microseconds:.1f} microseconds)")
+        else:
+            upper = "unknown" if upper is None else upper
+            print(f"Between {lower} and {upper} degrees ({microseconds:.1f} microseconds)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Streaming CSV loader for the degrees graph.
+
+Files are read in chunks of rows with a plain csv.reader rather than
+into nested dicts. Movies can be filtered by year and cast size, and
+people are only kept if they star in a kept movie, so a subgraph of the
+full dataset can be built on machines with limited memory.
+"""
+
+import csv
+import time
+from array import array
+from itertools import islice
+
+from graph import INDEX_TYPE
+
+CHUNK_SIZE = 100000
+
+# Rough per-entry costs used to estimate memory while loading
+BYTES_PER_EDGE = 2 * array(INDEX_TYPE).itemsize
+BYTES_PER_ENTITY = 200
+
+
+class LoadLimitExceeded(MemoryError):
+    """
+    Raised when loading would use more than the allowed memory.
+    """
+
+
+def chunks(path, chunk_size):
+    """
+    Yields (columns, rows) for successive chunks of a CSV file,
+    where columns maps header names to row positions.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = {name: i for i, name in enumerate(next(reader))}
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            yield columns, rows
+
+
+def parse_year(year):
+    try:
+        return int(year)
+    except ValueError:
+        return None
+
+
+def load_csv(graph, directory, min_year=None, max_year=None, min_cast=None,
+             chunk_size=CHUNK_SIZE, max_memory=None, progress=None):
+    """
+    Load people, movies and stars CSV files into the graph.
+
+    Movies outside [min_year, max_year] or with fewer than min_cast
+    rows in stars.csv are skipped, along with any person left without
+    a movie. With no filters, everyone in people.csv is kept, as before.
+
+    progress, if given, is called as progress(file, rows, seconds)
+    after every chunk. If max_memory is given, raises LoadLimitExceeded
+    once the estimated size of the loaded graph passes that many bytes.
+    """
+    filtered = min_year is not None or max_year is not None or min_cast is not None
+    stage = {}
+
+    def begin(name):
+        stage.update(name=name, rows=0, started=time.time())
+
+    def report(rows):
+        stage["rows"] += rows
+        if progress is not None:
+            progress(stage["name"], stage["rows"], time.time() - stage["started"])
+
+    def check_memory(edges, entities):
+        if max_memory is not None and edges * BYTES_PER_EDGE + entities * BYTES_PER_ENTITY > max_memory:
+            raise LoadLimitExceeded(
+                f"Loading {directory} needs more than {max_memory} bytes; tighten the filters")
+
+    # Movies within the year range
+    movies = {}
+    begin("movies.csv")
+    for columns, rows in chunks(f"{directory}/movies.csv", chunk_size):
+        id_column, title_column, year_column = columns["id"], columns["title"], columns["year"]
+        for row in rows:
+            if min_year is not None or max_year is not None:
+                year = parse_year(row[year_column])
+                if year is None \
+                        or (min_year is not None and year < min_year) \
+                        or (max_year is not None and year > max_year):
+                    continue
+            movies[row[id_column]] = (row[title_column], row[year_column])
+        check_memory(0, len(movies))
+        report(len(rows))
+
+    # Count each movie's stars so small casts can be dropped
+    if min_cast is not None:
+        cast = dict.fromkeys(movies, 0)
+        begin("stars.csv (cast sizes)")
+        for columns, rows in chunks(f"{directory}/stars.csv", chunk_size):
+            movie_column = columns["movie_id"]
+            for row in rows:
+                if row[movie_column] in cast:
+                    cast[row[movie_column]] += 1
+            report(len(rows))
+        movies = {movie_id: movie for movie_id, movie in movies.items() if cast[movie_id] >= min_cast}
+        del cast
+
+    for movie_id, (title, year) in movies.items():
+        graph.add_movie(movie_id, title, year)
+    del movies
+
+    # Star edges, with people numbered in order of first appearance
+    referenced = {}
+    edge_people = array(INDEX_TYPE)
+    edge_movies = array(INDEX_TYPE)
+    begin("stars.csv")
+    for columns, rows in chunks(f"{directory}/stars.csv", chunk_size):
+        person_column, movie_column = columns["person_id"], columns["movie_id"]
+        for row in rows:
+            movie = graph.movie_index.get(row[movie_column])
+            if movie is None:
+                continue
+            person = referenced.setdefault(row[person_column], len(referenced))
+            edge_people.append(person)
+            edge_movies.append(movie)
+        check_memory(len(edge_people), len(graph.movie_ids) + len(referenced))
+        report(len(rows))
+
+    # People, keeping only those who star in a kept movie when filtering
+    remap = array(INDEX_TYPE, [-1]) * len(referenced)
+    begin("people.csv")
+    for columns, rows in chunks(f"{directory}/people.csv", chunk_size):
+        id_column, name_column, birth_column = columns["id"], columns["name"], columns["birth"]
+        for row in rows:
+            person = referenced.get(row[id_column])
+            if person is None and filtered:
+                continue
+            index = graph.add_person(row[id_column], row[name_column], row[birth_column])
+            if person is not None:
+                remap[person] = index
+        check_memory(len(edge_people), len(graph.movie_ids) + len(graph.person_ids))
+        report(len(rows))
+    del referenced
+
+    # Drop edges to people missing from people.csv
+    people = array(INDEX_TYPE)
+    kept_movies = array(INDEX_TYPE)
+    for person, movie in zip(edge_people, edge_movies):
+        if remap[person] != -1:
+            people.append(remap[person])
+            kept_movies.append(movie)
+    del edge_people, edge_movies, remap
+
+    graph.build_adjacency(people, kept_movies)
+    graph.build_name_index()
+
+
+def add_filter_arguments(parser):
+    """
+    Adds the loader's filter and progress options to an argument parser.
+    """
+    parser.add_argument("--min-year", type=int, help="skip movies released before this year")
+    parser.add_argument("--max-year", type=int, help="skip movies released after this year")
+    parser.add_argument("--min-cast", type=int, help="skip movies with fewer stars than this")
+    parser.add_argument("--max-memory", type=int, metavar="MB",
+                        help="stop loading once the graph would need more than this many megabytes")
+    parser.add_argument("--progress", action="store_true", help="report rows loaded per second")
+
+
+def filters_from_args(args):
+    """
+    Returns the movie filters chosen on the command line as a dict.
+    """
+    return {"min_year": args.min_year, "max_year": args.max_year, "min_cast": args.min_cast}
+
+
+def active_filters(filters):
+    """
+    Returns a dict of movie filters without the ones left unset.
+    """
+    return {name: value for name, value in (filters or {}).items() if value is not None}
+
+
+def print_progress(file):
+    """
+    Returns a progress callback printing rows per second to file.
+    """
+    def progress(name, rows, seconds):
+        rate = rows / seconds if seconds > 0 else 0
+        print(f"{name}: {rows:,} rows ({rate:,.0f} rows/sec)", file=file, flush=True)
+
+    return progress
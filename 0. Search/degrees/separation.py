@@ -0,0 +1,186 @@
+"""
+Degree-of-separation statistics computed by breadth-first search
+from many source actors in parallel.
+
+Each worker process maps the same binary snapshot of the graph, so the
+graph is shared read-only through the page cache rather than copied.
+Visited people and movies are tracked in bitsets.
+
+Usage: python separation.py [directory] [--sources FILE] [--sample N] [--processes N]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+import degrees
+
+
+def bitset(size):
+    """
+    Returns an all-clear bitset able to hold size bits.
+    """
+    return bytearray((size + 7) >> 3)
+
+
+def bfs_levels(graph, source):
+    """
+    Breadth-first search from a person index, expanding each movie
+    at most once. Returns a list where element d is the number
+    of people at distance d from the source.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    visited_people = bitset(len(person_offsets) - 1)
+    visited_movies = bitset(len(movie_offsets) - 1)
+    visited_people[source >> 3] |= 1 << (source & 7)
+
+    levels = [1]
+    frontier = [source]
+    while True:
+        next_frontier = []
+        for person in frontier:
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if visited_movies[movie >> 3] & (1 << (movie & 7)):
+                    continue
+                visited_movies[movie >> 3] |= 1 << (movie & 7)
+                for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if not visited_people[star >> 3] & (1 << (star & 7)):
+                        visited_people[star >> 3] |= 1 << (star & 7)
+                        next_frontier.append(star)
+        if not next_frontier:
+            return levels
+        levels.append(len(next_frontier))
+        frontier = next_frontier
+
+
+def bfs_distances(graph, source, unreachable=255):
+    """
+    Breadth-first search from a person index, returning a bytearray
+    of every person's distance from the source, capped below
+    unreachable, which marks people in other components.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    distances = bytearray([unreachable]) * (len(person_offsets) - 1)
+    visited_movies = bitset(len(movie_offsets) - 1)
+    distances[source] = 0
+
+    distance = 0
+    frontier = [source]
+    while frontier:
+        distance = min(distance + 1, unreachable - 1)
+        next_frontier = []
+        for person in frontier:
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if visited_movies[movie >> 3] & (1 << (movie & 7)):
+                    continue
+                visited_movies[movie >> 3] |= 1 << (movie & 7)
+                for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if distances[star] == unreachable:
+                        distances[star] = distance
+                        next_frontier.append(star)
+        frontier = next_frontier
+
+    return distances
+
+
+def init_worker(directory):
+    """
+    Loads the graph once per worker process.
+    """
+    degrees.load_data(directory)
+
+
+def source_statistics(person_id):
+    """
+    Returns (person_id, levels) for a single source IMDB id.
+    """
+    return person_id, bfs_levels(degrees.graph, degrees.graph.person_index[person_id])
+
+
+def degree_statistics(directory, sources, processes=None):
+    """
+    Runs a breadth-first search from every source IMDB id across
+    a pool of processes sharing the graph in directory.
+
+    Returns a tuple (histogram, per_source). histogram is a Counter
+    mapping distance to the number of (source, person) pairs at that
+    distance. per_source maps each source to a dict of its eccentricity
+    (distance to the furthest reachable person), the number of people
+    it reaches, and the mean distance to them.
+    """
+    # Make sure an up-to-date snapshot exists before workers map it
+    degrees.load_data(directory)
+
+    histogram = Counter()
+    per_source = {}
+    with Pool(processes, initializer=init_worker, initargs=(directory,)) as pool:
+        for person_id, levels in pool.imap_unordered(source_statistics, sources, chunksize=4):
+            for distance, count in enumerate(levels):
+                histogram[distance] += count
+            reached = sum(levels) - 1
+            per_source[person_id] = {
+                "eccentricity": len(levels) - 1,
+                "reached": reached,
+                "mean_distance": sum(d * count for d, count in enumerate(levels)) / reached if reached else None,
+            }
+
+    return histogram, per_source
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degree-of-separation statistics.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--sources", metavar="FILE",
+                        help="file of source names or IMDB ids, one per line")
+    parser.add_argument("--sample", type=int, default=100,
+                        help="number of random sources when no file is given")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory)
+    graph = degrees.graph
+
+    if args.sources:
+        sources = []
+        with open(args.sources, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    person_ids = degrees.person_ids_for_query(line.strip())
+                    if len(person_ids) != 1:
+                        sys.exit(f"Expected exactly one person for '{line.strip()}', found {len(person_ids)}")
+                    sources.append(person_ids[0])
+    else:
+        count = min(args.sample, len(graph.person_ids))
+        sources = [graph.person_ids[i] for i in random.sample(range(len(graph.person_ids)), count)]
+
+    timer = time.time()
+    histogram, per_source = degree_statistics(args.directory, sources, args.processes)
+    seconds_taken = time.time() - timer
+    print(f"Searched from {len(sources)} sources in {seconds_taken} seconds")
+
+    print("Distance histogram:")
+    for distance in sorted(histogram):
+        print(f"{distance:>4}: {histogram[distance]}")
+
+    print("Per source:")
+    for person_id, statistics in per_source.items():
+        name = graph.person_names[graph.person_index[person_id]]
+        mean = statistics["mean_distance"]
+        mean = f"{mean:.3f}" if mean is not None else "-"
+        print(f"{name} ({person_id}): eccentricity {statistics['eccentricity']}, "
+              f"reached {statistics['reached']}, mean distance {mean}")
+
+
+if __name__ == "__main__":
+    main()
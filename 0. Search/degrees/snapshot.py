@@ -0,0 +1,239 @@
+"""
+Binary on-disk snapshot of a loaded Graph.
+
+A snapshot holds every index array of the graph plus string tables for
+ids, names, titles and years, each in an 8-byte aligned section. Loading
+memory-maps the file and exposes the sections as zero-copy memoryviews,
+so it takes milliseconds rather than a full CSV parse.
+
+Usage: python snapshot.py [directory] [--min-year Y] [--max-year Y] [--min-cast N]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+import loader
+from graph import Graph, INDEX_TYPE
+
+SNAPSHOT_NAME = "graph.snapshot"
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+MAGIC = b"DEGREES\x02"
+
+# Graph attributes stored as plain index arrays
+ARRAY_SECTIONS = ("person_offsets", "person_movies", "movie_offsets", "movie_stars",
+                  "name_order", "name_tree")
+
+# Graph attributes stored as string tables
+STRING_SECTIONS = ("person_ids", "person_names", "person_births",
+                   "movie_ids", "movie_titles", "movie_years")
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as one UTF-8 blob,
+    where string i is blob[offsets[i]:offsets[i + 1]].
+    """
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class IdIndex():
+    """
+    Read-only mapping of IMDB id to dense index, backed by
+    a permutation of indexes sorted by id.
+    """
+    def __init__(self, ids, order):
+        self.ids = ids
+        self.order = order
+
+    def get(self, key, default=None):
+        i = bisect_left(self.order, key, key=lambda index: self.ids[index])
+        if i < len(self.order) and self.ids[self.order[i]] == key:
+            return self.order[i]
+        return default
+
+    def __getitem__(self, key):
+        index = self.get(key)
+        if index is None:
+            raise KeyError(key)
+        return index
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.order)
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def source_mtimes(directory):
+    """
+    Returns the modification times of the CSV files in a directory.
+    """
+    return {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in SOURCE_FILES}
+
+
+def encode_strings(strings):
+    """
+    Encodes a sequence of strings into a (blob, offsets) pair.
+    """
+    blob = bytearray()
+    offsets = array(INDEX_TYPE, [0])
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return blob, offsets
+
+
+def write_snapshot(graph, path, sources, filters=None):
+    """
+    Writes a graph to a snapshot file, recording the source
+    CSV modification times and loader filters it was built from,
+    leaving out unset filters as is_fresh does.
+    """
+    sections = {}
+    for name in ARRAY_SECTIONS:
+        sections[name] = getattr(graph, name)
+    for name in STRING_SECTIONS:
+        blob, offsets = encode_strings(getattr(graph, name))
+        sections[f"{name}.blob"] = blob
+        sections[f"{name}.offsets"] = offsets
+    for name in ("person_ids", "movie_ids"):
+        ids = getattr(graph, name)
+        sections[f"{name}.order"] = array(INDEX_TYPE, sorted(range(len(ids)), key=ids.__getitem__))
+
+    # Lay out each section on an 8-byte boundary after the header
+    layout = {}
+    position = 0
+    for name, data in sections.items():
+        size = len(memoryview(data).cast("B"))
+        layout[name] = [position, size]
+        position += size + (-size % 8)
+    header = json.dumps({
+        "typecode": INDEX_TYPE,
+        "itemsize": array(INDEX_TYPE).itemsize,
+        "sources": sources,
+        "filters": loader.active_filters(filters),
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            data = memoryview(data).cast("B")
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(temporary, path)
+
+
+def read_header(f):
+    """
+    Reads a snapshot header, returning None if the file is not a snapshot.
+    """
+    if f.read(len(MAGIC)) != MAGIC:
+        return None
+    (length,) = struct.unpack("<Q", f.read(8))
+    header = json.loads(f.read(length))
+    header["data_start"] = len(MAGIC) + 8 + length
+    return header
+
+
+def is_fresh(path, directory, filters=None):
+    """
+    Returns True if a snapshot exists, matches this platform's index
+    layout and was built from the current CSV files with the same filters.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = read_header(f)
+    except (OSError, ValueError):
+        return False
+    return header is not None \
+        and header["typecode"] == INDEX_TYPE \
+        and header["itemsize"] == array(INDEX_TYPE).itemsize \
+        and header["sources"] == source_mtimes(directory) \
+        and header.get("filters", {}) == loader.active_filters(filters)
+
+
+def load_snapshot(graph, path):
+    """
+    Memory-maps a snapshot file into an existing graph.
+    """
+    with open(path, "rb") as f:
+        header = read_header(f)
+        if header is None:
+            raise ValueError(f"{path} is not a degrees snapshot")
+        graph.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data = memoryview(graph.mmap)[header["data_start"]:]
+
+    def section(name, typecode=INDEX_TYPE):
+        start, size = header["sections"][name]
+        return data[start:start + size].cast(typecode)
+
+    for name in ARRAY_SECTIONS:
+        setattr(graph, name, section(name))
+    for name in STRING_SECTIONS:
+        setattr(graph, name, StringTable(section(f"{name}.blob", "B"), section(f"{name}.offsets")))
+    graph.person_index = IdIndex(graph.person_ids, section("person_ids.order"))
+    graph.movie_index = IdIndex(graph.movie_ids, section("movie_ids.order"))
+
+
+def compile_snapshot(directory, filters=None, **options):
+    """
+    Parses the CSV files in a directory and writes their snapshot.
+    Returns the loaded graph.
+    """
+    filters = loader.active_filters(filters)
+    sources = source_mtimes(directory)
+    graph = Graph()
+    loader.load_csv(graph, directory, **filters, **options)
+    write_snapshot(graph, snapshot_path(directory), sources, filters)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a binary snapshot of a degrees dataset.")
+    parser.add_argument("directory", nargs="?", default="large")
+    loader.add_filter_arguments(parser)
+    args = parser.parse_args()
+    directory = args.directory
+
+    print(f"Compiling {directory}...")
+    graph = compile_snapshot(
+        directory, loader.filters_from_args(args),
+        max_memory=args.max_memory * 2**20 if args.max_memory else None,
+        progress=loader.print_progress(sys.stdout) if args.progress else None)
+    size = os.path.getsize(snapshot_path(directory))
+    print(f"Wrote {len(graph.person_ids)} people and {len(graph.movie_ids)} movies "
+          f"to {snapshot_path(directory)} ({size} bytes).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Headless benchmark of the Tic Tac Toe minimax search.
+
+Runs minimax with and without its transposition table, which looks up
+positions already searched by another move order or in an earlier
+search, or symmetric to one already searched. Reports the nodes
+searched, alpha-beta cutoffs and time taken for the first move and
+for every reachable position in turn, against looking each move up
+in the precomputed solution table.
+
+Usage: python benchmark.py [--repeat 5]
+"""
+
+import argparse
+import time
+
+import solution
+import tictactoe as ttt
+from bitboard import reachable_positions
+
+
+def search(positions, transpositions, repeat, solution_table=None):
+    """
+    Runs minimax on each position, starting from an empty transposition
+    table, and answering from solution_table if one is given. Returns
+    (nodes, cutoffs, table hits, seconds): the totals over all positions,
+    with the best time of repeat runs.
+    """
+    ttt.solution_table = solution_table
+    best = float("inf")
+    for _ in range(repeat):
+        nodes = cutoffs = hits = 0
+        ttt.transposition_table.clear()
+        timer = time.perf_counter()
+        for board in positions:
+            ttt.minimax(board, transpositions)
+            nodes += ttt.stats["nodes"]
+            cutoffs += ttt.stats["cutoffs"]
+            hits += ttt.stats["table_hits"]
+        best = min(best, time.perf_counter() - timer)
+    ttt.solution_table = None
+    return nodes, cutoffs, hits, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Tic Tac Toe minimax search.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs to take the best time from")
+    args = parser.parse_args()
+
+    positions = reachable_positions()
+    table = solution.load_table()
+    for name, boards in [("first move", [ttt.initial_state()]),
+                         (f"all {len(positions):,} positions", positions)]:
+        print(f"{name}:")
+        for label, transpositions, solution_table in [("alpha-beta", False, None),
+                                                      ("with table", True, None),
+                                                      ("lookup", True, table)]:
+            nodes, cutoffs, hits, seconds = search(boards, transpositions, args.repeat, solution_table)
+            print(f"  {label:<12} {nodes:>10,} nodes {cutoffs:>9,} cutoffs {hits:>9,} table hits"
+                  f" {seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
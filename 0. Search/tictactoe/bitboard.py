@@ -0,0 +1,207 @@
+"""
+Bitboard Tic Tac Toe engine.
+
+The board is a pair of 9-bit integers, one holding X's marks and one
+holding O's, with cell (i, j) at bit 3 * i + j:
+
+  0 | 1 | 2
+  3 | 4 | 5
+  6 | 7 | 8
+
+A move is the single bit of its cell, so making and unmaking a move
+is one OR or XOR, and a win is looked up in a table of all 512 masks.
+"""
+
+X = "X"
+O = "O"
+
+SIZE = 3
+CELLS = SIZE * SIZE
+FULL = (1 << CELLS) - 1
+
+# The eight lines of three: rows, columns and diagonals
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+# 1 for each mask of marks that holds a complete line
+WINNING = bytes(any(mask & line == line for line in WIN_MASKS) for mask in range(1 << CELLS))
+
+
+def symmetries() -> list:
+    """
+    Returns the eight rotations and reflections of the board (the
+    dihedral group D4), each as a list of the cell each cell moves to.
+    """
+    turn = [SIZE * j + (SIZE - 1 - i) for i in range(SIZE) for j in range(SIZE)]
+    mirror = [SIZE * i + (SIZE - 1 - j) for i in range(SIZE) for j in range(SIZE)]
+    cells = list(range(CELLS))
+    found = []
+    for _ in range(4):
+        found.append(cells)
+        found.append([mirror[cell] for cell in cells])
+        cells = [turn[cell] for cell in cells]
+    return found
+
+
+def transform(mask: int, cells: list) -> int:
+    """
+    Returns a mask with each bit moved to its cell in a symmetry.
+    """
+    return sum(1 << cells[cell] for cell in range(CELLS) if mask >> cell & 1)
+
+
+# Each mask's marks as base-3 digits, cell 0 lowest, so that a
+# position's code is TERNARY[x] + 2 * TERNARY[o]
+TERNARY = [sum(3 ** cell for cell in range(CELLS) if mask >> cell & 1) for mask in range(1 << CELLS)]
+
+# For each symmetry, the base-3 digits of each mask moved through it
+SYMMETRIC_TERNARY = [[TERNARY[transform(mask, cells)] for mask in range(1 << CELLS)] for cells in symmetries()]
+
+
+def bit(action: tuple) -> int:
+    """
+    Returns the move bit for an action (i, j).
+    """
+    i, j = action
+    return 1 << (SIZE * i + j)
+
+
+def position(move: int) -> tuple:
+    """
+    Returns the action (i, j) for a move bit.
+    """
+    return divmod(move.bit_length() - 1, SIZE)
+
+
+class Board():
+    """
+    A position as X and O masks, with the player to move. Moves are
+    made and unmade in place:
+
+      board = Board.from_list(ttt.initial_state())
+      for move in board.moves():
+          board.make(move)
+          ...
+          board.unmake(move)
+    """
+    def __init__(self, x: int = 0, o: int = 0):
+        self.x = x
+        self.o = o
+        # X moves first, so it is X's turn when both have as many marks
+        self.x_to_move = bin(x).count("1") == bin(o).count("1")
+
+    @classmethod
+    def from_list(cls, board: list):
+        """
+        Makes a Board from the nested list board of tictactoe.py.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell == X:
+                    x |= bit((i, j))
+                elif cell == O:
+                    o |= bit((i, j))
+        return cls(x, o)
+
+    def to_list(self) -> list:
+        """
+        Returns the board as a nested list, as in tictactoe.py.
+        """
+        return [[X if self.x >> (SIZE * i + j) & 1 else O if self.o >> (SIZE * i + j) & 1 else None
+                 for j in range(SIZE)]
+                for i in range(SIZE)]
+
+    def player(self) -> str:
+        return X if self.x_to_move else O
+
+    def code(self) -> int:
+        """
+        Returns the position's base-3 code, with a digit per cell of
+        0 for empty, 1 for X and 2 for O.
+        """
+        return TERNARY[self.x] + 2 * TERNARY[self.o]
+
+    def canonical(self) -> int:
+        """
+        Returns the smallest code among the position's eight rotations
+        and reflections, shared by every position symmetric to it.
+        """
+        x, o = self.x, self.o
+        return min([digits[x] + 2 * digits[o] for digits in SYMMETRIC_TERNARY])
+
+    def empty(self) -> int:
+        """
+        Returns the mask of empty cells.
+        """
+        return FULL & ~(self.x | self.o)
+
+    def moves(self):
+        """
+        Yields the move bit of each empty cell, lowest first.
+        """
+        empty = FULL & ~(self.x | self.o)
+        while empty:
+            move = empty & -empty
+            yield move
+            empty ^= move
+
+    def make(self, move: int):
+        if self.x_to_move:
+            self.x |= move
+        else:
+            self.o |= move
+        self.x_to_move = not self.x_to_move
+
+    def unmake(self, move: int):
+        self.x_to_move = not self.x_to_move
+        if self.x_to_move:
+            self.x ^= move
+        else:
+            self.o ^= move
+
+    def winner(self) -> str:
+        if WINNING[self.x]:
+            return X
+        if WINNING[self.o]:
+            return O
+        return None
+
+    def terminal(self) -> bool:
+        return bool(WINNING[self.x] or WINNING[self.o] or (self.x | self.o) == FULL)
+
+    def utility(self) -> int:
+        """
+        Returns 1 if X has won, -1 if O has won, 0 otherwise.
+        """
+        if WINNING[self.x]:
+            return 1
+        if WINNING[self.o]:
+            return -1
+        return 0
+
+
+def reachable_positions() -> list:
+    """
+    Returns every position reachable from the empty board
+    with the game not yet over, as list boards.
+    """
+    seen = set()
+    positions = []
+    board = Board()
+
+    def visit():
+        if board.code() in seen or board.terminal():
+            return
+        seen.add(board.code())
+        positions.append(board.to_list())
+        for move in board.moves():
+            board.make(move)
+            visit()
+            board.unmake(move)
+
+    visit()
+    return positions
@@ -0,0 +1,403 @@
+"""
+m,n,k game engine: boards of any size, won by k marks in a row.
+
+Tic Tac Toe is the 3,3,3 game; 4,4,4 or 15,15,5 (gomoku) are far too
+large to search to the end. The engine searches with iterative
+deepening alpha-beta (negamax) within a time budget, one ply deeper
+each round until time runs out, and plays the best move of the last
+round it finished.
+
+At the search horizon a position is scored by its open lines: each
+window of k cells holding marks of only one player counts for that
+player, more the more marks it holds. Scores are kept up to date as
+moves are made, by rescoring only the windows through the moved cell.
+
+Moves are searched in order of the move found best in the previous
+round, then killer moves (the moves that last caused a cutoff at the
+same ply), then by history (how often and how deep each cell has
+caused cutoffs). Only cells within two of an existing mark are
+considered, found by shifting the mask of marks in each direction.
+
+Usage: python mnk.py [--rows 15] [--columns 15] [--k 5] [--budget 1.0]
+                     [--moves 20] [--max-depth DEPTH]
+"""
+
+import argparse
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a win, less the plies taken to reach it, so that
+# quicker wins and slower losses are preferred
+WIN = 1_000_000
+
+# Cells this far from a mark, in rows and columns, are searched
+RADIUS = 2
+
+# Killer moves kept for each ply
+KILLERS = 2
+
+# Nodes between checks of the clock
+CHECK_EVERY = 1024
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out.
+    """
+
+
+class Game():
+    """
+    The geometry of an m,n,k game: rows by columns cells, with cell
+    (i, j) at bit columns * i + j, and every window of k cells in a
+    line as a list of its cells.
+    """
+    def __init__(self, rows: int = 3, columns: int = 3, k: int = 3):
+        if not 0 < k <= max(rows, columns):
+            raise ValueError(f"Cannot get {k} in a row on a {rows}x{columns} board")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.cells = rows * columns
+        self.full = (1 << self.cells) - 1
+
+        # Masks of the cells not in the first or last column, for
+        # shifting masks sideways without wrapping around a row
+        first_column = sum(1 << (columns * i) for i in range(rows))
+        self.not_first_column = self.full & ~first_column
+        self.not_last_column = self.full & ~(first_column << (columns - 1))
+
+        self.windows = []
+        for i in range(rows):
+            for j in range(columns):
+                for d_i, d_j in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i, end_j = i + d_i * (k - 1), j + d_j * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < columns:
+                        self.windows.append([self.index(i + d_i * step, j + d_j * step) for step in range(k)])
+
+        # For each cell, the windows through it
+        self.cell_windows = [[] for _ in range(self.cells)]
+        for window, cells in enumerate(self.windows):
+            for cell in cells:
+                self.cell_windows[cell].append(window)
+
+        # Score of a window holding c marks of one player only
+        self.weights = [0] + [4 ** c for c in range(1, k + 1)]
+
+    def index(self, i: int, j: int) -> int:
+        return self.columns * i + j
+
+    def position(self, cell: int) -> tuple:
+        return divmod(cell, self.columns)
+
+    def dilate(self, mask: int) -> int:
+        """
+        Returns a mask with every cell next to a cell in mask added,
+        including diagonally.
+        """
+        sideways = mask | (mask << 1) & self.not_first_column | (mask >> 1) & self.not_last_column
+        return (sideways | sideways << self.columns | sideways >> self.columns) & self.full
+
+
+class Position():
+    """
+    A position in an m,n,k game, with X and O masks, the player to
+    move and the evaluation from X's point of view, all updated in
+    place as moves are made and unmade.
+    """
+    def __init__(self, game: Game):
+        self.game = game
+        self.x = 0
+        self.o = 0
+        self.x_to_move = True
+        self.winner = None
+        self.score = 0
+        self.x_counts = [0] * len(game.windows)
+        self.o_counts = [0] * len(game.windows)
+        # Each move made, with the winner before it, to restore on unmake
+        self.made = []
+
+    @classmethod
+    def from_list(cls, game: Game, board: list):
+        """
+        Makes a Position from a nested list board of X, O and EMPTY,
+        as in tictactoe.py, with the marks played in any order.
+        """
+        x_cells = [game.index(i, j) for i, row in enumerate(board) for j, cell in enumerate(row) if cell == X]
+        o_cells = [game.index(i, j) for i, row in enumerate(board) for j, cell in enumerate(row) if cell == O]
+        if not 0 <= len(x_cells) - len(o_cells) <= 1:
+            raise ValueError("X must have as many marks as O, or one more")
+
+        position = cls(game)
+        for turn in range(len(x_cells) + len(o_cells)):
+            position.make(x_cells[turn // 2] if turn % 2 == 0 else o_cells[turn // 2])
+        return position
+
+    def player(self) -> str:
+        return X if self.x_to_move else O
+
+    def occupied(self) -> int:
+        return self.x | self.o
+
+    def full(self) -> bool:
+        return (self.x | self.o) == self.game.full
+
+    def window_score(self, window: int) -> int:
+        x_count, o_count = self.x_counts[window], self.o_counts[window]
+        if x_count and o_count:
+            return 0
+        return self.game.weights[x_count] - self.game.weights[o_count]
+
+    def make(self, cell: int) -> bool:
+        """
+        Marks a cell for the player to move. Returns True if it wins.
+        """
+        counts = self.x_counts if self.x_to_move else self.o_counts
+        k = self.game.k
+        wins = False
+        for window in self.game.cell_windows[cell]:
+            self.score -= self.window_score(window)
+            counts[window] += 1
+            self.score += self.window_score(window)
+            if counts[window] == k:
+                wins = True
+
+        if self.x_to_move:
+            self.x |= 1 << cell
+        else:
+            self.o |= 1 << cell
+        self.made.append((cell, self.winner))
+        if wins and self.winner is None:
+            self.winner = self.player()
+        self.x_to_move = not self.x_to_move
+        return wins
+
+    def unmake(self, cell: int):
+        self.x_to_move = not self.x_to_move
+        _, self.winner = self.made.pop()
+        if self.x_to_move:
+            self.x ^= 1 << cell
+        else:
+            self.o ^= 1 << cell
+
+        counts = self.x_counts if self.x_to_move else self.o_counts
+        for window in self.game.cell_windows[cell]:
+            self.score -= self.window_score(window)
+            counts[window] -= 1
+            self.score += self.window_score(window)
+
+    def undo(self, moves: int):
+        """
+        Unmakes moves until only the given number are left made.
+        """
+        while len(self.made) > moves:
+            self.unmake(self.made[-1][0])
+
+    def candidates(self) -> list:
+        """
+        Returns the empty cells within RADIUS of a mark, or the centre
+        cell on an empty board. If every cell near a mark is taken, all
+        the empty cells are returned.
+        """
+        occupied = self.x | self.o
+        if not occupied:
+            return [self.game.index(self.game.rows // 2, self.game.columns // 2)]
+        near = occupied
+        for _ in range(RADIUS):
+            near = self.game.dilate(near)
+        near &= ~occupied
+        if not near:
+            near = self.game.full & ~occupied
+
+        cells = []
+        while near:
+            low = near & -near
+            cells.append(low.bit_length() - 1)
+            near ^= low
+        return cells
+
+    def evaluate(self) -> int:
+        """
+        Returns the heuristic score for the player to move.
+        """
+        return self.score if self.x_to_move else -self.score
+
+
+class Searcher():
+    """
+    Iterative deepening alpha-beta search with killer and history
+    move ordering. Counts of the last search are kept on the searcher:
+
+      searcher = Searcher(budget=1.0)
+      cell = searcher.best_move(position)
+      print(searcher.depth, searcher.nodes, searcher.cutoffs)
+    """
+    def __init__(self, budget: float = 1.0, max_depth: int = None):
+        self.budget = budget
+        self.max_depth = max_depth
+        self.history = None
+        self.killers = []
+        self.deadline = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.depth = 0
+        self.value = 0
+
+    def best_move(self, position: Position) -> int:
+        """
+        Returns the best cell found for the player to move within the
+        time budget, or None if the game is over.
+        """
+        if position.winner is not None or position.full():
+            return None
+        self.nodes = self.cutoffs = self.depth = self.value = 0
+        candidates = position.candidates()
+        if len(candidates) == 1:
+            # No need to search when there is only one move to play
+            return candidates[0]
+
+        game = position.game
+        if self.history is None or len(self.history) != game.cells:
+            self.history = [0] * game.cells
+        else:
+            # Older cutoffs count for less as the game moves on
+            self.history = [score // 2 for score in self.history]
+        empty = game.cells - bin(position.occupied()).count("1")
+        self.killers = [[None] * KILLERS for _ in range(empty + 1)]
+        self.deadline = time.perf_counter() + self.budget
+
+        best = None
+        made = len(position.made)
+        for depth in range(1, min(empty, self.max_depth or empty) + 1):
+            try:
+                value, move = self.search_root(position, depth, best)
+            except SearchTimeout:
+                # Take back the moves the unfinished round was searching
+                position.undo(made)
+                break
+            best, self.value, self.depth = move, value, depth
+            if abs(value) >= WIN - game.cells:
+                # A forced win or loss was found, which deeper
+                # searches cannot change
+                break
+        # With no round finished in time, play the first candidate
+        return best if best is not None else candidates[0]
+
+    def ordered(self, position: Position, ply: int, first: int = None) -> list:
+        """
+        Returns the candidate moves in the order to search them.
+        """
+        history = self.history
+        moves = sorted(position.candidates(), key=lambda cell: history[cell], reverse=True)
+        front = [first] if first is not None else []
+        front += [cell for cell in self.killers[ply] if cell is not None and cell != first]
+        if front:
+            moves = [cell for cell in front if cell in moves] + [cell for cell in moves if cell not in front]
+        return moves
+
+    def search_root(self, position: Position, depth: int, previous_best: int) -> tuple:
+        """
+        Searches every move at the root to a depth, starting
+        with the best move of the previous round. Returns
+        (value, move).
+        """
+        alpha, beta = -WIN - 1, WIN + 1
+        best_value, best_move = -WIN - 1, None
+        for cell in self.ordered(position, 0, previous_best):
+            if position.make(cell):
+                value = WIN - 1
+            else:
+                value = -self.search(position, depth - 1, -beta, -alpha, 1)
+            position.unmake(cell)
+            if value > best_value:
+                best_value, best_move = value, cell
+                alpha = max(alpha, value)
+        return best_value, best_move
+
+    def search(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """
+        Fail-soft negamax alpha-beta search. Returns the value of the
+        position for the player to move, searched to a depth.
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if depth == 0:
+            return position.evaluate()
+        moves = self.ordered(position, ply)
+        if not moves:
+            return 0
+
+        best = -WIN - 1
+        for cell in moves:
+            if position.make(cell):
+                value = WIN - ply - 1
+            else:
+                value = -self.search(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake(cell)
+            if value > best:
+                best = value
+                alpha = max(alpha, value)
+            if alpha >= beta:
+                self.cutoffs += 1
+                killers = self.killers[ply]
+                if cell not in killers:
+                    killers.insert(0, cell)
+                    killers.pop()
+                self.history[cell] += depth * depth
+                break
+        return best
+
+
+def best_action(board: list, k: int = None, budget: float = 1.0) -> tuple:
+    """
+    Returns the best action (i, j) found within budget seconds for the
+    player to move on a nested list board of any size, as in
+    tictactoe.py, where k in a row wins (by default the board's width).
+    Returns None if the game is over.
+    """
+    rows, columns = len(board), len(board[0])
+    game = Game(rows, columns, k or min(rows, columns))
+    position = Position.from_list(game, board)
+    cell = Searcher(budget).best_move(position)
+    return None if cell is None else game.position(cell)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play an m,n,k game with iterative deepening search.")
+    parser.add_argument("--rows", type=int, default=15)
+    parser.add_argument("--columns", type=int, default=15)
+    parser.add_argument("--k", type=int, default=5, help="marks in a row to win")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--moves", type=int, default=20, help="moves to play at most")
+    parser.add_argument("--max-depth", type=int, help="plies to search at most")
+    args = parser.parse_args()
+
+    game = Game(args.rows, args.columns, args.k)
+    position = Position(game)
+    searcher = Searcher(args.budget, args.max_depth)
+    for turn in range(args.moves):
+        timer = time.perf_counter()
+        cell = searcher.best_move(position)
+        if cell is None:
+            break
+        seconds = time.perf_counter() - timer
+        player = position.player()
+        position.make(cell)
+        print(f"{turn + 1:>3}. {player} {game.position(cell)}  depth {searcher.depth:>2}  "
+              f"{searcher.nodes:>9,} nodes  {searcher.cutoffs:>8,} cutoffs  {seconds:.2f} s")
+
+    for i in range(game.rows):
+        print(" ".join(X if position.x >> game.index(i, j) & 1 else O if position.o >> game.index(i, j) & 1 else "."
+                       for j in range(game.columns)))
+    if position.winner is not None:
+        print(f"{position.winner} wins")
+    elif position.full():
+        print("Tie")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,9 @@ user = None
 board = ttt.initial_state()
 ai_turn = False
 
+# Answer the AI's moves from the precomputed solution table
+ttt.load_solution()
+
 while True:
 
     for event in pygame.event.get():
@@ -0,0 +1,146 @@
+"""
+Precomputed solution table for Tic Tac Toe.
+
+Every position reachable from the empty board is solved once, without
+pruning, and its value and best move are written to a table of one
+byte per base-3 board code (3 ** 9 = 19,683 bytes). The table is
+memory-mapped at startup, so minimax answers any position with a
+single lookup instead of a search.
+
+Usage: python solution.py [--output solution.table]
+"""
+
+import argparse
+import mmap
+import os
+import time
+
+from bitboard import Board, CELLS
+
+SOLUTION_NAME = "solution.table"
+MAGIC = b"TTTSOLV\x01"
+
+# Number of base-3 codes, one per way of filling the cells
+CODES = 3 ** CELLS
+
+# Entries hold the best move's cell in the low four bits and the
+# position's value, 1 if X wins, 0 for a tie or -1 if O wins, plus one
+# in the two bits above it. Positions that cannot be reached are
+# UNREACHABLE, and finished games have NO_MOVE.
+UNREACHABLE = 255
+NO_MOVE = 15
+VALUE_SHIFT = 4
+
+
+def default_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), SOLUTION_NAME)
+
+
+def entry_value(entry: int) -> int:
+    return (entry >> VALUE_SHIFT) - 1
+
+
+def entry_move(entry: int) -> int:
+    """
+    Returns the move bit stored in an entry, or None for a finished game.
+    """
+    cell = entry & NO_MOVE
+    return None if cell == NO_MOVE else 1 << cell
+
+
+def solve() -> bytearray:
+    """
+    Solves every reachable position by a full game-tree search, with
+    each position searched once. Where several moves are best, the
+    lowest cell is kept.
+    """
+    table = bytearray([UNREACHABLE]) * CODES
+    board = Board()
+
+    def value():
+        code = board.code()
+        if table[code] != UNREACHABLE:
+            return entry_value(table[code])
+
+        if board.terminal():
+            best, cell = board.utility(), NO_MOVE
+        else:
+            best = cell = None
+            maximizing = board.x_to_move
+            for move in board.moves():
+                board.make(move)
+                move_value = value()
+                board.unmake(move)
+                if best is None or (move_value > best if maximizing else move_value < best):
+                    best, cell = move_value, move.bit_length() - 1
+
+        table[code] = (best + 1) << VALUE_SHIFT | cell
+        return best
+
+    value()
+    return table
+
+
+def write_table(table, path):
+    """
+    Writes a solution table to disk.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(table)
+    os.replace(temporary, path)
+
+
+def read_table(path):
+    """
+    Memory-maps a solution table from disk, returning None
+    if the file is missing or not a solution table.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC or os.fstat(f.fileno()).st_size != len(MAGIC) + CODES:
+            return None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped)[len(MAGIC):]
+
+
+def load_table(path=None):
+    """
+    Loads the solution table, solving and writing it first
+    if it is missing or not a solution table.
+    """
+    path = path or default_path()
+    table = read_table(path)
+    if table is not None:
+        return table
+
+    table = solve()
+    try:
+        write_table(table, path)
+    except OSError:
+        pass
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Tic Tac Toe into a lookup table.")
+    parser.add_argument("--output", default=default_path(), help="where to write the table")
+    args = parser.parse_args()
+
+    timer = time.perf_counter()
+    table = solve()
+    seconds = time.perf_counter() - timer
+    write_table(table, args.output)
+
+    positions = sum(entry != UNREACHABLE for entry in table)
+    print(f"Solved {positions:,} positions in {seconds * 1000:.1f} ms, "
+          f"written to {args.output} ({len(MAGIC) + len(table):,} bytes)")
+    print(f"The game is worth {entry_value(table[0])} with best play")
+
+
+if __name__ == "__main__":
+    main()
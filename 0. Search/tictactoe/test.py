@@ -1,16 +1,106 @@
-from tictactoe import initial_state
-from tictactoe import player
-from tictactoe import actions
-from tictactoe import result
-from tictactoe import winner
-from tictactoe import terminal
-from tictactoe import utility
-from tictactoe import minimax
-
-board = initial_state()
-actions = actions(board)
-winner = winner(board)
-terminal = terminal(board)
-utility = utility(board)
-minimax = minimax(board)
-print(minimax)
+"""
+Checks tictactoe.py against a brute-force solution of the whole game.
+
+solution.solve searches the full game tree without pruning. For every
+position reachable from the empty board with the game not yet over,
+the negamax value must match the solved value, and the move minimax
+picks must keep that value, with and without the transposition table
+and when answering from a solution table read back from disk.
+
+Usage: python test.py
+"""
+
+import os
+import sys
+import tempfile
+
+import solution
+import tictactoe as ttt
+from bitboard import Board, reachable_positions
+
+
+def solved_value(table, board: list) -> int:
+    """
+    Returns the brute-force value of a board for the player to move,
+    whether or not the game is over.
+    """
+    state = Board.from_list(board)
+    value = solution.entry_value(table[state.code()])
+    return value if state.x_to_move else -value
+
+
+def check_values(table, positions, transpositions) -> int:
+    """
+    Returns the number of positions whose negamax value differs from
+    the solved value.
+    """
+    ttt.transposition_table.clear()
+    failures = 0
+    for board in positions:
+        searched = ttt.negamax(Board.from_list(board), float('-inf'), float('inf'),
+                               ttt.transposition_table if transpositions else None)[0]
+        if searched != solved_value(table, board):
+            failures += 1
+            print(f"  value {searched}, expected {solved_value(table, board)}: {board}")
+    return failures
+
+
+def check_moves(table, positions, transpositions) -> int:
+    """
+    Returns the number of positions where the move minimax picks
+    loses value against the solved value.
+    """
+    ttt.transposition_table.clear()
+    failures = 0
+    for board in positions:
+        action = ttt.minimax(board, transpositions)
+        if action not in ttt.actions(board):
+            failures += 1
+            print(f"  illegal move {action}: {board}")
+            continue
+        # The value for the player moving is the negation of the
+        # value for the player to move after it
+        value = -solved_value(table, ttt.result(board, action))
+        if value != solved_value(table, board):
+            failures += 1
+            print(f"  move {action} worth {value}, expected {solved_value(table, board)}: {board}")
+    return failures
+
+
+def main():
+    table = solution.solve()
+    positions = reachable_positions()
+    print(f"Checking {len(positions):,} positions against the brute-force solution")
+
+    board = ttt.initial_state()
+    failures = 0
+    if ttt.player(board) != ttt.X or len(ttt.actions(board)) != 9 or ttt.winner(board) is not None \
+            or ttt.terminal(board) or ttt.utility(board) != 0:
+        failures += 1
+        print("  wrong answers for the initial state")
+
+    checks = [
+        ("negamax values", check_values, False),
+        ("negamax values with table", check_values, True),
+        ("minimax moves", check_moves, False),
+        ("minimax moves with table", check_moves, True),
+    ]
+    for name, check, transpositions in checks:
+        found = check(table, positions, transpositions)
+        print(f"  {name:<28} {'ok' if not found else f'{found:,} failed'}")
+        failures += found
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, solution.SOLUTION_NAME)
+        solution.write_table(table, path)
+        ttt.load_solution(path)
+        found = check_moves(table, positions, False)
+        print(f"  {'solution table moves':<28} {'ok' if not found else f'{found:,} failed'}")
+        failures += found
+        ttt.solution_table = None
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
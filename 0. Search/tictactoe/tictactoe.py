@@ -2,13 +2,30 @@
 Tic Tac Toe Player
 """
 
-import math
-import copy
+import solution
+from bitboard import Board, bit, position
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Transposition table entry flags: the stored value is exact, or
+# only a lower or upper bound on the position's value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Values and bounds of positions searched so far, keyed by canonical
+# code and kept between searches, as a position's value does not
+# depend on the moves that led to it
+transposition_table = {}
+
+# Node counts from the last minimax search
+stats = {"nodes": 0, "cutoffs": 0, "table_hits": 0}
+
+# Memory-mapped table of every position's best move, once loaded
+solution_table = None
+
 
 def initial_state() -> list:
     """
@@ -25,11 +42,7 @@ def player(board: list) -> str:
     In the initial game state, X gets the first move. 
     Subsequently, the player alternates with each additional move.
     """
-    count_of_empty = sum(row.count(EMPTY) for row in board)
-    if count_of_empty % 2 == 0:
-        return "O"
-    else:
-        return "X"
+    return Board.from_list(board).player()
 
 
 def actions(board: list) -> set:
@@ -39,16 +52,7 @@ def actions(board: list) -> set:
     j corresponds to which cell/tile in the row corresponds to the move (also 0, 1, or 2).
     Possible moves are any cells on the board that do not already have an X or an O in them.
     """
-    possible_actions = set()
-    empty_cells_matrix = [map(lambda i: i == EMPTY, tile) for tile in board]
-    # print([list(cell) for cell in empty_cells_matrix])
-    for i, row in enumerate(empty_cells_matrix):
-        for j, tile in enumerate(row):
-            if tile is True:
-                action = (i, j)
-                possible_actions.add(action)
-    # print(possible_actions)
-    return possible_actions
+    return {position(move) for move in Board.from_list(board).moves()}
 
 
 def result(board: list, action: tuple) -> list:
@@ -56,12 +60,10 @@ def result(board: list, action: tuple) -> list:
     Returns the board that results from making move (i, j) on the board.
     """
     i, j = action
-    if i < 3 and j < 3 and board[i][j] is EMPTY:
-        current_player = player(board)
-        new_board = copy.deepcopy(board)
-        new_board[i][j] = current_player
-        # print(new_board)
-        return new_board
+    state = Board.from_list(board)
+    if 0 <= i < 3 and 0 <= j < 3 and state.empty() & bit(action):
+        state.make(bit(action))
+        return state.to_list()
     else:
         raise Exception("Action invalid!")
 
@@ -70,144 +72,131 @@ def winner(board: list) -> str:
     """
     Returns the winner of the game, if there is one.
     If the game is a tie or in progress, should return None.
-    Implements A/B pruning to avoid unneeded checks.
-    """
-    if check_horizontal(board) != None:
-        return check_horizontal(board)
-    elif check_vertical(board) != None:
-        return check_vertical(board)
-    elif check_diagonal(board) != None:
-        return check_diagonal(board)
-    elif len(actions(board)) == 0:
-        return None
-    else:
-        return None
-
-
-def check_horizontal(board: list) -> str:
-    """
-    Checks board horizontal lines for winner
-    Returns the winner if there is one.
-    """
-    for row in board:
-        if row.count(X) == 3:
-            return X
-        elif row.count(O) == 3:
-            return O
-
-    return None
-
-
-def check_vertical(board: list) -> str:
-    """
-    Checks board vertical lines for winner
-    Returns the winner if there is one.
-    """
-    for i in range(len(board)):
-        column = [board[0][i], board[1][i], board[2][i]]
-        if column.count(X) == 3:
-            return X
-        elif column.count(O) == 3:
-            return O
-
-    return None
-
-
-def check_diagonal(board: list) -> str:
     """
-    Checks board diagonal lines for winner
-    Returns the winner if there is one.
-    """
-    diagonal_one = [board[0][0], board[1][1], board[2][2]]
-    diagonal_two = [board[0][2], board[1][1], board[2][0]]
-
-    if diagonal_one.count(X) == 3 or diagonal_two.count(X) == 3:
-        return X
-    elif diagonal_one.count(O) == 3 or diagonal_two.count(O) == 3:
-        return O
-    else:
-        return None
+    return Board.from_list(board).winner()
 
 
 def terminal(board: list) -> bool:
     """
     Returns True if game is over, False otherwise.
     """
-    game_won, no_more_moves = winner(board) != None, len(actions(board)) is 0
-    return True if game_won or no_more_moves else False
+    return Board.from_list(board).terminal()
 
 
 def utility(board: list) -> int:
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    utility = {
-        X: 1,
-        None: 0,
-        O: -1
-    }
+    return Board.from_list(board).utility()
+
 
-    evaluator = winner(board)
-    return utility.get(evaluator)
+def load_solution(path: str = None):
+    """
+    Loads the solution table that minimax answers from, solving the
+    game and writing the table first if it is not on disk yet.
+    """
+    global solution_table
+    solution_table = solution.load_table(path)
 
 
-def minimax(board: list) -> tuple:
+def minimax(board: list, transpositions: bool = True) -> tuple:
     """
     Returns the optimal action for the current player on the board.
     The move returned should be the optimal action (i, j) that is one of the allowable actions on the board. 
-    Both players start with your worst score. If player is Max (X), its score is -infinity. 
-    Else if player is Min (O), its score is +infinity.
-    """
-    if terminal(board):
+    Once load_solution has been called, the move is looked up in the
+    solution table, and only boards missing from it are searched.
+    With transpositions set, positions already searched, in this or an
+    earlier search, or symmetric to one already searched, are looked
+    up in the transposition table. Node counts are left in stats.
+    """
+    stats.update(nodes=0, cutoffs=0, table_hits=0)
+    state = Board.from_list(board)
+    if state.terminal():
         return None
-    Max = float('-inf')
-    Min = float('inf')
-
-    if player(board) is X:
-        return max_value(board, Max, Min)[1]
+    if solution_table is not None:
+        entry = solution_table[state.code()]
+        if entry != solution.UNREACHABLE:
+            return position(solution.entry_move(entry))
+    table = None
+    if transpositions:
+        table = transposition_table
+        # The board itself is searched again, as the table holds no moves
+        table.pop(state.canonical(), None)
+
+    return position(negamax(state, float('-inf'), float('inf'), table)[1])
+
+
+def probe(board: Board, alpha: float, beta: float, table: dict) -> tuple:
+    """
+    Looks a position up in the transposition table. Returns the
+    (alpha, beta) window narrowed by a stored bound, and the stored
+    value if it settles the position's value, or else None.
+    """
+    entry = table.get(board.canonical())
+    if entry is None:
+        return alpha, beta, None
+    value, flag = entry
+    if flag == EXACT:
+        return alpha, beta, value
+    if flag == LOWER:
+        alpha = max(alpha, value)
     else:
-        return min_value(board, Max, Min)[1]
+        beta = min(beta, value)
+    return alpha, beta, value if alpha >= beta else None
 
 
-def max_value(board: list, Max: float, Min: float) -> tuple:
+def store(board: Board, value: int, alpha: float, beta: float, table: dict):
     """
-    Returns the value and optimal action (v, a) that gives X (max) player maximum score.
-    Starts with worst value of -infinity and wants a 1 for a win.
+    Stores a position's value in the transposition table, as an upper
+    bound if it failed low against the (alpha, beta) window it was
+    searched with, a lower bound if it failed high, or else as exact.
     """
-    if terminal(board):
-        return [utility(board), None]
-
-    best_move = None
-    value = float('-inf')
-    possible_actions = actions(board)
-    for action in possible_actions:
-        new_board_state = result(board, action)
-        move_value = min_value(new_board_state, Max, Min)[0]
-        Max = max(Max, move_value)
-        if move_value > value:
-            value, best_move = move_value, action
-        if Max >= Min:
-            break
-    return tuple([value, best_move])
+    if value <= alpha:
+        flag = UPPER
+    elif value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table[board.canonical()] = (value, flag)
 
 
-def min_value(board: list, Max: float, Min: float) -> tuple:
+def negamax(board: Board, alpha: float, beta: float, table: dict = None) -> tuple:
     """
-    Returns the value and optimal action (v, a) that gives O (min) player minimum score.
-    Starts with worst value of +infinity and wants a -1 for a win.
+    Returns the value and optimal move bit (v, a) for the player to move,
+    with 1 for a win, 0 for a tie and -1 for a loss, so that each
+    player's value is the negation of the other's.
+
+    Fail-soft alpha-beta: a value at or below alpha is an upper bound on
+    the true value, and at or above beta a lower bound, and within the
+    window it is exact. Each move is searched with the window negated
+    and swapped, (-beta, -alpha), narrowed by the best value so far.
+    Moves are made and unmade on the bitboard in place.
     """
-    if terminal(board):
-        return [utility(board), None]
+    stats["nodes"] += 1
+    if board.terminal():
+        # A finished game was won by the player who just moved, if anyone
+        return -1 if board.winner() is not None else 0, None
+
+    if table is not None:
+        alpha, beta, value = probe(board, alpha, beta, table)
+        if value is not None:
+            stats["table_hits"] += 1
+            return value, None
+    window = alpha, beta
 
     best_move = None
-    value = float('inf')
-    possible_actions = actions(board)
-    for action in possible_actions:
-        new_board_state = result(board, action)
-        move_value = max_value(new_board_state, Max, Min)[0]
-        Min = min(Min, move_value)
-        if move_value < value:
-            value, best_move = move_value, action
-        if Max >= Min:
+    value = float('-inf')
+    for move in board.moves():
+        board.make(move)
+        move_value = -negamax(board, -beta, -alpha, table)[0]
+        board.unmake(move)
+        if move_value > value:
+            value, best_move = move_value, move
+            alpha = max(alpha, value)
+        if alpha >= beta:
+            stats["cutoffs"] += 1
             break
-    return tuple([value, best_move])
+
+    if table is not None:
+        store(board, value, *window, table)
+    return value, best_move